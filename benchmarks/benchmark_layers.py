@@ -0,0 +1,344 @@
+import os
+import sys
+import json
+import time
+import resource
+import platform
+import argparse
+
+import numpy as np
+import tensorflow as tf
+
+from complex_layers.networks import *
+from complex_layers.recurrent import *
+from complex_layers.activations import *
+from complex_layers.normalization import *
+from spectral_layers.STFT import *
+"""
+Micro-benchmark of every complex and spectral layer
+
+    python -m benchmarks.benchmark_layers --output benchmark.json
+    python -m benchmarks.benchmark_layers --filter Conv2D --batch_sizes 1 32 --iterations 50
+
+For every case x batch size, forward (inference) and backward (gradient of the sum of the outputs
+w.r.t. the inputs and the trainable weights) are traced once with tf.function, warmed up, then timed per call.
+    throughput : samples per second (batch_size / mean latency)
+    latency_ms : p50, p90, p99, mean
+    memory     : peak allocator bytes of the device when TensorFlow tracks it (GPU),
+                 otherwise the growth of the process peak RSS during the case (CPU, 0 if an earlier case peaked higher)
+Every complex layer is paired with a real-valued baseline on tf.concat([real, imag], -1)
+whose parameter count is matched as closely as the layer shape allows, both counts are reported.
+"""
+
+
+def matched_units (params, fan_in):
+
+    'number of real units / filters with fan_in inputs (+ bias) closest to params'
+    return max(1, int(round(params / (fan_in + 1))))
+
+
+def dense_baseline (layer, shape):
+    return tf.keras.layers.Dense(matched_units(layer.count_params(), 2 * shape[-1]))
+
+def conv1d_baseline (layer, shape):
+    return tf.keras.layers.Conv1D(matched_units(layer.count_params(), 2 * shape[-1] * layer.kernel_size), layer.kernel_size, strides = layer.strides, padding = layer.padding)
+
+def conv1d_transpose_baseline (layer, shape):
+    return tf.keras.layers.Conv1DTranspose(matched_units(layer.count_params(), 2 * shape[-1] * layer.kernel_size), layer.kernel_size, strides = layer.strides, padding = layer.padding)
+
+def conv2d_baseline (layer, shape):
+    return tf.keras.layers.Conv2D(matched_units(layer.count_params(), 2 * shape[-1] * np.prod(layer.kernel_size)), layer.kernel_size, strides = layer.strides, padding = layer.padding)
+
+def conv2d_transpose_baseline (layer, shape):
+    return tf.keras.layers.Conv2DTranspose(matched_units(layer.count_params(), 2 * shape[-1] * np.prod(layer.kernel_size)), layer.kernel_size, strides = layer.strides, padding = layer.padding)
+
+def grouped_conv2d_baseline (layer, shape):
+    filters = matched_units(layer.count_params(), 2 * shape[-1] // layer.groups * np.prod(layer.kernel_size))
+    return tf.keras.layers.Conv2D(max(layer.groups, filters // layer.groups * layer.groups), layer.kernel_size, strides = layer.strides, padding = layer.padding, groups = layer.groups)
+
+def dilated_conv1d_baseline (layer, shape):
+    return tf.keras.layers.Conv1D(matched_units(layer.count_params(), 2 * shape[-1] * layer.kernel_size), layer.kernel_size, padding = layer.padding, dilation_rate = layer.dilation_rate)
+
+def depthwise_conv2d_baseline (layer, shape):
+    return tf.keras.layers.DepthwiseConv2D(layer.kernel_size, strides = layer.strides, padding = layer.padding, depth_multiplier = 2 * layer.depth_multiplier)
+
+def separable_conv2d_baseline (layer, shape):
+    depthwise = 2 * shape[-1] * np.prod(layer.kernel_size)
+    return tf.keras.layers.SeparableConv2D(matched_units(layer.count_params() - depthwise, 2 * shape[-1]), layer.kernel_size, strides = layer.strides, padding = layer.padding)
+
+def max_pool2d_baseline (layer, shape):
+    return tf.keras.layers.MaxPool2D(pool_size = layer.pool_size, strides = layer.strides, padding = layer.padding)
+
+def avg_pool2d_baseline (layer, shape):
+    return tf.keras.layers.AveragePooling2D(pool_size = layer.pool_size, strides = layer.strides, padding = layer.padding)
+
+def global_max_pool2d_baseline (layer, shape):
+    return tf.keras.layers.GlobalMaxPool2D()
+
+def conv3d_baseline (layer, shape):
+    return tf.keras.layers.Conv3D(matched_units(layer.count_params(), 2 * shape[-1] * np.prod(layer.kernel_size)), layer.kernel_size, strides = layer.strides, padding = layer.padding)
+
+def conv3d_transpose_baseline (layer, shape):
+    return tf.keras.layers.Conv3DTranspose(matched_units(layer.count_params(), 2 * shape[-1] * np.prod(layer.kernel_size)), layer.kernel_size, strides = layer.strides, padding = layer.padding)
+
+def batchnorm_baseline (layer, shape):
+    return tf.keras.layers.BatchNormalization()
+
+def layernorm_baseline (layer, shape):
+    return tf.keras.layers.LayerNormalization(axis = -1)
+
+def recurrent_units (params, fan_in, gates):
+
+    'number of real units of a gates-gate recurrent layer closest to params, gates * u * (fan_in + u + 1) = params'
+    return max(1, int(round((-(fan_in + 1) + np.sqrt((fan_in + 1) ** 2 + 4 * params / gates)) / 2)))
+
+def lstm_baseline (layer, shape):
+    return tf.keras.layers.LSTM(recurrent_units(layer.count_params(), 2 * shape[-1], 4))
+
+def gru_baseline (layer, shape):
+    return tf.keras.layers.GRU(recurrent_units(layer.count_params(), 2 * shape[-1], 3))
+
+def groupnorm_baseline (layer, shape):
+    return tf.keras.layers.GroupNormalization(groups = 2 * layer.num_groups)
+
+def relu_baseline (layer, shape):
+    return tf.keras.layers.ReLU()
+
+def tanh_baseline (layer, shape):
+    return tf.keras.layers.Activation("tanh")
+
+def leaky_relu_baseline (layer, shape):
+    return tf.keras.layers.LeakyReLU(alpha = 0.2)
+
+def softmax_baseline (layer, shape):
+    return tf.keras.layers.Softmax()
+
+def stft_baseline (layer, shape):
+    return tf.keras.layers.Conv1D(2 * layer.frequency_bin, layer.window_length, strides = layer.over_lapping, padding = layer.padding, use_bias = False)
+
+def istft_baseline (layer, shape):
+    return tf.keras.layers.Conv1DTranspose(1, layer.window_length, strides = layer.over_lapping, padding = layer.padding, use_bias = False)
+
+
+'(case name, complex layer factory, baseline factory, kind, input shapes without batch)'
+'kind : "pair" (real, imag) | "concat" tf.concat([real, imag]) | "activation" layer | "signal" | "spectrogram" (real, imag)'
+CASES = [
+    ("complex_Dense",                   lambda: complex_Dense(units = 256),                                         dense_baseline,            "pair",        [(256,), (64, 256)]),
+    ("complex_Dense(fused)",            lambda: complex_Dense(units = 256, fused = True),                           dense_baseline,            "pair",        [(256,), (64, 256)]),
+    ("complex_Conv1D",                  lambda: complex_Conv1D(filters = 32, kernel_size = 9, strides = 2),         conv1d_baseline,           "pair",        [(1024, 16)]),
+    ("complex_Conv1DTranspose",         lambda: complex_Conv1DTranspose(filters = 32, kernel_size = 9, strides = 2), conv1d_transpose_baseline, "pair",       [(512, 16)]),
+    ("complex_Conv2D",                  lambda: complex_Conv2D(filters = 32),                                       conv2d_baseline,           "pair",        [(64, 64, 16), (128, 32, 8)]),
+    ("complex_Conv2D(gauss)",           lambda: complex_Conv2D(filters = 32, gauss = True),                         conv2d_baseline,           "pair",        [(64, 64, 16), (128, 32, 8)]),
+    ("complex_Conv2D(groups = 4)",      lambda: complex_Conv2D(filters = 32, groups = 4),                           grouped_conv2d_baseline,   "pair",        [(64, 64, 16)]),
+    ("complex_Conv1D(dilated)",         lambda: complex_Conv1D(filters = 32, kernel_size = 3, dilation_rate = 8),   dilated_conv1d_baseline,   "pair",        [(1024, 16)]),
+    ("complex_DepthwiseConv2D",         lambda: complex_DepthwiseConv2D(),                                          depthwise_conv2d_baseline, "pair",        [(64, 64, 16)]),
+    ("complex_SeparableConv2D",         lambda: complex_SeparableConv2D(filters = 32),                              separable_conv2d_baseline, "pair",        [(64, 64, 16)]),
+    ("complex_Conv2DTranspose",         lambda: complex_Conv2DTranspose(filters = 16),                              conv2d_transpose_baseline, "pair",        [(32, 32, 32)]),
+    ("complex_Conv2DTranspose(gauss)",  lambda: complex_Conv2DTranspose(filters = 16, gauss = True),                conv2d_transpose_baseline, "pair",        [(32, 32, 32)]),
+    ("complex_Conv3D",                  lambda: complex_Conv3D(filters = 16),                                       conv3d_baseline,           "pair",        [(16, 32, 32, 8)]),
+    ("complex_Conv3D(unfused)",         lambda: complex_Conv3D(filters = 16, fused = False),                        conv3d_baseline,           "pair",        [(16, 32, 32, 8)]),
+    ("complex_Conv3D(gauss)",           lambda: complex_Conv3D(filters = 16, fused = False, gauss = True),          conv3d_baseline,           "pair",        [(16, 32, 32, 8)]),
+    ("complex_Conv3DTranspose",         lambda: complex_Conv3DTranspose(filters = 8),                               conv3d_transpose_baseline, "pair",        [(8, 16, 16, 16)]),
+    ("complex_Conv3DTranspose(unfused)", lambda: complex_Conv3DTranspose(filters = 8, fused = False),               conv3d_transpose_baseline, "pair",        [(8, 16, 16, 16)]),
+    ("complex_Conv3DTranspose(gauss)",  lambda: complex_Conv3DTranspose(filters = 8, fused = False, gauss = True), conv3d_transpose_baseline, "pair",        [(8, 16, 16, 16)]),
+    ("complex_MaxPool2D",               lambda: complex_MaxPool2D(strides = (2, 2)),                                max_pool2d_baseline,       "pair",        [(64, 64, 16)]),
+    ("complex_AvgPool2D",               lambda: complex_AvgPool2D(strides = (2, 2)),                                avg_pool2d_baseline,       "pair",        [(64, 64, 16)]),
+    ("complex_GlobalMaxPool2D",         lambda: complex_GlobalMaxPool2D(),                                          global_max_pool2d_baseline, "pair",       [(64, 64, 16)]),
+    ("complex_NaiveBatchNormalization", lambda: complex_NaiveBatchNormalization(),                                  batchnorm_baseline,        "pair",        [(64, 64, 16)]),
+    ("complex_FusedBatchNorm",          lambda: complex_FusedBatchNorm(),                                           batchnorm_baseline,        "pair",        [(256,), (64, 64, 16)]),
+    ("complex_SyncBatchNorm",           lambda: complex_SyncBatchNorm(),                                            batchnorm_baseline,        "pair",        [(64, 64, 16)]),
+    ("complex_BatchNorm",               lambda: complex_BatchNorm(),                                                batchnorm_baseline,        "concat",      [(256,), (64, 64, 16)]),
+    ("complex_LayerNorm",               lambda: complex_LayerNorm(),                                                layernorm_baseline,        "pair",        [(64, 64, 16)]),
+    ("complex_InstanceNorm",            lambda: complex_InstanceNorm(),                                             groupnorm_baseline,        "pair",        [(64, 64, 16)]),
+    ("complex_GroupNorm",               lambda: complex_GroupNorm(groups = 4),                                      groupnorm_baseline,        "pair",        [(64, 64, 16)]),
+    ("complex_CReLU",                   lambda: complex_CReLU(),                                                    relu_baseline,             "activation",  [(64, 64, 16)]),
+    ("complex_zReLU",                   lambda: complex_zReLU(),                                                    relu_baseline,             "activation",  [(64, 64, 16)]),
+    ("complex_modReLU",                 lambda: complex_modReLU(),                                                  relu_baseline,             "activation",  [(64, 64, 16)]),
+    ("complex_LeakyReLU",               lambda: complex_LeakyReLU(alpha = 0.2),                                     leaky_relu_baseline,       "activation",  [(64, 64, 16)]),
+    ("complex_Tanh",                    lambda: complex_Tanh(),                                                     tanh_baseline,             "activation",  [(64, 64, 16)]),
+    ("complex_Softmax",                 lambda: complex_Softmax(),                                                  softmax_baseline,          "activation",  [(64, 64, 16)]),
+    ("complex_LSTM",                    lambda: complex_LSTM(units = 128),                                          lstm_baseline,             "pair",        [(100, 257)]),
+    ("complex_GRU",                     lambda: complex_GRU(units = 128),                                           gru_baseline,              "pair",        [(100, 257)]),
+    ("STFT_network(conv)",              lambda: STFT_network(engine = "conv"),                                      stft_baseline,             "signal",      [(16384, 1)]),
+    ("STFT_network(fused_conv)",        lambda: STFT_network(engine = "fused_conv"),                                stft_baseline,             "signal",      [(16384, 1)]),
+    ("STFT_network(fft)",               lambda: STFT_network(engine = "fft"),                                       stft_baseline,             "signal",      [(16384, 1)]),
+    ("ISTFT_network(conv)",             lambda: ISTFT_network(engine = "conv"),                                     istft_baseline,            "spectrogram", [(64, 513)]),
+    ("ISTFT_network(fft)",              lambda: ISTFT_network(engine = "fft"),                                      istft_baseline,            "spectrogram", [(64, 513)]),
+]
+
+
+def complex_runner (layer, kind):
+
+    'the (inputs) -> outputs function of one complex case, inputs is the list given to make_inputs'
+    if kind == "concat":
+        return lambda real, imag: layer(tf.concat([real, imag], axis = -1), training = True)
+    if kind == "activation":
+        return lambda real, imag: layer(real, imag)
+    if kind == "signal":
+        return lambda signal: layer(signal)
+    if isinstance(layer, (complex_FusedBatchNorm, complex_NaiveBatchNormalization)):
+        return lambda real, imag: layer(real, imag, training = True)
+    return lambda real, imag: layer(real, imag)
+
+
+def baseline_runner (layer, kind):
+
+    if kind == "signal":
+        return lambda signal: layer(signal)
+    if isinstance(layer, (tf.keras.layers.BatchNormalization, tf.keras.layers.GroupNormalization)):
+        return lambda real, imag: layer(tf.concat([real, imag], axis = -1), training = True)
+    return lambda real, imag: layer(tf.concat([real, imag], axis = -1))
+
+
+def make_inputs (kind, batch_size, shape):
+
+    if kind == "signal":
+        return [tf.random.normal((batch_size,) + shape)]
+
+    return [tf.random.normal((batch_size,) + shape), tf.random.normal((batch_size,) + shape)]
+
+
+def count_params (layer):
+
+    return int(layer.count_params()) if isinstance(layer, tf.keras.layers.Layer) else 0
+
+
+def time_calls (function, inputs, warmup, iterations):
+
+    for _ in range(warmup):
+        tf.nest.map_structure(lambda tensor: tensor.numpy(), function(*inputs))
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        tf.nest.map_structure(lambda tensor: tensor.numpy(), function(*inputs))
+        latencies.append(time.perf_counter() - start)
+
+    return np.array(latencies) * 1e+3
+
+
+def summarize (latencies_ms, batch_size):
+
+    return {"throughput" : float(batch_size / (np.mean(latencies_ms) * 1e-3)),
+            "latency_ms" : {"p50"  : float(np.percentile(latencies_ms, 50)),
+                            "p90"  : float(np.percentile(latencies_ms, 90)),
+                            "p99"  : float(np.percentile(latencies_ms, 99)),
+                            "mean" : float(np.mean(latencies_ms))}}
+
+
+def peak_rss_bytes ():
+
+    'ru_maxrss is KB on Linux, bytes on macOS'
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure_memory (device, run):
+
+    try:
+        tf.config.experimental.reset_memory_stats(device)
+    except (ValueError, tf.errors.OpError):
+        pass
+
+    rss_before = peak_rss_bytes()
+    run()
+
+    try:
+        peak = tf.config.experimental.get_memory_info(device)["peak"]
+    except (ValueError, tf.errors.OpError):
+        peak = 0
+
+    if peak:
+        return {"source" : "device", "peak_bytes" : int(peak)}
+
+    return {"source" : "process_peak_rss_growth", "peak_bytes" : int(peak_rss_bytes() - rss_before)}
+
+
+def benchmark_layer (layer, runner, inputs, batch_size, warmup, iterations, device):
+
+    'builds the layer on inputs, then times forward and backward'
+    runner(*inputs)
+    weights = layer.trainable_weights if isinstance(layer, tf.keras.layers.Layer) else []
+
+    forward = tf.function(runner)
+
+    @tf.function
+    def backward (*inputs):
+        with tf.GradientTape() as tape:
+            tape.watch(inputs)
+            outputs = runner(*inputs)
+            loss = tf.add_n([tf.reduce_sum(tf.abs(output) if output.dtype.is_complex else output) for output in tf.nest.flatten(outputs)])
+        return tape.gradient(loss, list(inputs) + list(weights))
+
+    result = {}
+    result["memory"]   = measure_memory(device, lambda: time_calls(backward, inputs, 1, 1))
+    result["forward"]  = summarize(time_calls(forward, inputs, warmup, iterations), batch_size)
+    result["backward"] = summarize(time_calls(backward, inputs, warmup, iterations), batch_size)
+
+    return result
+
+
+def run (cases, batch_sizes, warmup, iterations):
+
+    device  = "GPU:0" if tf.config.list_physical_devices("GPU") else "CPU:0"
+    results = []
+    for name, complex_factory, baseline_factory, kind, shapes in cases:
+        for shape in shapes:
+            for batch_size in batch_sizes:
+                inputs = make_inputs(kind, batch_size, shape)
+
+                record = {"layer" : name, "kind" : kind, "batch_size" : batch_size, "input_shape" : list(shape)}
+                'a failing case is recorded and the suite goes on'
+                try:
+                    layer = complex_factory()
+                    record.update(benchmark_layer(layer, complex_runner(layer, kind), inputs, batch_size, warmup, iterations, device))
+                    record["params"] = count_params(layer)
+
+                    baseline = baseline_factory(layer, shape)
+                    record["baseline"] = {"layer" : type(baseline).__name__}
+                    record["baseline"].update(benchmark_layer(baseline, baseline_runner(baseline, kind), inputs, batch_size, warmup, iterations, device))
+                    record["baseline"]["params"] = count_params(baseline)
+                except Exception as error:
+                    record["error"] = type(error).__name__ + ": " + str(error).split("\n")[0]
+                    results.append(record)
+                    print("%-32s %-16s batch %4d  failed, %s" % (name, str(shape), batch_size, record["error"]))
+                    continue
+
+                results.append(record)
+                print("%-32s %-16s batch %4d  forward %10.1f /s  backward %10.1f /s  baseline forward %10.1f /s" % (
+                      name, str(shape), batch_size, record["forward"]["throughput"], record["backward"]["throughput"], record["baseline"]["forward"]["throughput"]))
+
+    return results
+
+
+def environment ():
+
+    return {"tensorflow" : tf.__version__,
+            "python"     : platform.python_version(),
+            "platform"   : platform.platform(),
+            "processor"  : platform.processor(),
+            "cpu_count"  : os.cpu_count(),
+            "devices"    : [device.name for device in tf.config.list_physical_devices()],
+            "policy"     : tf.keras.mixed_precision.global_policy().name}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = "complex_layers / spectral_layers micro-benchmark")
+    parser.add_argument("--output", default = "benchmark.json", help = "JSON results path")
+    parser.add_argument("--batch_sizes", type = int, nargs = "+", default = [1, 8, 32])
+    parser.add_argument("--warmup", type = int, default = 3)
+    parser.add_argument("--iterations", type = int, default = 20)
+    parser.add_argument("--filter", default = None, help = "only the cases whose name contains this string")
+    parser.add_argument("--policy", default = None, help = "Keras mixed precision policy, e.g. mixed_bfloat16")
+    arguments = parser.parse_args()
+
+    if arguments.policy is not None:
+        tf.keras.mixed_precision.set_global_policy(arguments.policy)
+
+    cases   = [case for case in CASES if arguments.filter is None or arguments.filter in case[0]]
+    results = run(cases, arguments.batch_sizes, arguments.warmup, arguments.iterations)
+
+    with open(arguments.output, "w") as file:
+        json.dump({"environment" : environment(), "results" : results}, file, indent = 2)
+    print("saved", len(results), "results to", arguments.output)
@@ -1,60 +1,162 @@
 import numpy as np
 import tensorflow as tf
+from tensorflow.keras import constraints
+from tensorflow.keras import regularizers
+from tensorflow.keras import initializers
 
+from complex_layers.utils import *
 
-def complex_flatten (real, imag):
+'''
+Every activation takes (real, imag) and returns (real, imag),
+or takes a single complex64 tensor and returns a single complex64 tensor (imag = None).
+    zReLU, modReLU, complex_softmax  : functions of the complex number (magnitude and phase), the kernel runs on complex64,
+                                       the (real, imag) form is the adapter pair_kernel (merge, kernel, split).
+                                       jit_compile = True compiles the adapter and the kernel into one XLA kernel,
+                                       the merged complex tensor is never materialized. Without XLA the adapter
+                                       costs a merge and a split (2 - 3x slower on CPU).
+    CReLU, CLeaky_ReLU, complex_tanh : functions of the real and imag parts, the (real, imag) form is the kernel,
+                                       the complex64 form reads the parts of the input and builds one complex64 output.
+float16 / bfloat16 (real, imag) keep their dtype, there is no half precision complex dtype,
+so they are merged in float32 and cast back.
+
+The functions create no layer and no variable, modReLU takes its bias as an argument (zeros when None).
+The complex_* Layer classes below wrap them for models, modReLU bias is created once in build.
+'''
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+FUSED KERNELS
+complex64 -> complex64 elementwise ops, no bool tensor, the magnitude is one sqrt(real^2 + imag^2),
+so XLA (jit_compile = True) emits each of them as a single kernel reading the input once.
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+def magnitude (inputs):
+
+    '|z| = sqrt(real^2 + imag^2), clamped at the smallest normal float so that the gradient at 0 is 0, not nan as tf.abs'
+    real, imag = tf.math.real(inputs), tf.math.imag(inputs)
+    return tf.sqrt(tf.maximum(real * real + imag * imag, np.finfo(real.dtype.as_numpy_dtype).tiny))
+
+
+def zrelu_kernel (inputs):
+
+    'z where real > 0 and imag > 0, else 0. sign(relu(real)) * sign(relu(imag)) is the mask without a bool tensor'
+    mask = tf.sign(tf.nn.relu(tf.math.real(inputs))) * tf.sign(tf.nn.relu(tf.math.imag(inputs)))
+    return inputs * tf.cast(mask, inputs.dtype)
+
+
+def modrelu_kernel (inputs, bias, epsilon):
+
+    norm  = magnitude(inputs)
+    scale = tf.nn.relu(norm + tf.cast(bias, norm.dtype)) / (norm + epsilon)
+
+    return inputs * tf.cast(scale, inputs.dtype)
+
+
+def softmax_kernel (inputs, axis):
+
+    return tf.nn.softmax(magnitude(inputs), axis = axis)
+
+
+def pair_kernel (kernel):
+
+    '(real, imag) adapter of a complex64 kernel, a real output (complex_softmax) is returned as it is'
+    def adapter (real, imag, *args):
+
+        outputs = kernel(merge_complex(real, imag), *args)
+        if not is_complex(outputs):
+            return outputs
+
+        return cast_pair(*split_complex(outputs), real.dtype)
+
+    return adapter
+
+
+'one XLA-compiled tf.function per kernel and per form, shared by every layer'
+COMPILED_KERNELS = {}
+
+def activation_kernel (kernel, pair = False, jit_compile = True):
+
+    function = pair_kernel(kernel) if pair else kernel
+    if not jit_compile:
+        return function
+
+    if (kernel, pair) not in COMPILED_KERNELS:
+        COMPILED_KERNELS[(kernel, pair)] = tf.function(function, jit_compile = True, reduce_retracing = True)
+    return COMPILED_KERNELS[(kernel, pair)]
+
+
+def on_parts (function, inputs):
+
+    'complex64 form of an activation of the real and imag parts, the parts are read from the input'
+    real, imag = function(*split_complex(inputs))
+    return tf.complex(real, imag)
+
+
+def flatten (inputs):
+
+    'tf.keras.layers.Flatten without a layer, [batch, ...] -> [batch, prod(...)]'
+    if inputs.shape[1:].is_fully_defined():
+        return tf.reshape(inputs, [-1, int(np.prod(inputs.shape[1:]))])
+    return tf.reshape(inputs, [tf.shape(inputs)[0], -1])
+
+
+def complex_flatten (real, imag = None):
+
+    'a complex64 tensor is flattened as it is'
+    if imag is None:
+        return flatten(real)
     
-    real = tf.keras.layers.Flatten()(real)
-    imag = tf.keras.layers.Flatten()(imag)
+    real = flatten(real)
+    imag = flatten(imag)
     
     return real, imag
 
 
-def CReLU (real, imag):
+def CReLU (real, imag = None):
+
+    if imag is None:
+        return on_parts(CReLU, real)
     
-    real = tf.keras.layers.ReLU()(real)
-    imag = tf.keras.layers.ReLU()(imag)
+    real = tf.nn.relu(real)
+    imag = tf.nn.relu(imag)
     
     return real, imag
 
 
-def zReLU (real, imag):
+def zReLU (real, imag = None, jit_compile = True):
 
-    real = tf.keras.layers.ReLU()(real)
-    imag = tf.keras.layers.ReLU()(imag)
-    
-    real_flag = tf.cast(tf.cast(real, tf.bool), tf.float32)
-    imag_flag = tf.cast(tf.cast(imag, tf.bool), tf.float32)
-    
-    flag = real_flag * imag_flag
+    if imag is None:
+        return activation_kernel(zrelu_kernel, jit_compile = jit_compile)(real)
 
-    real = tf.math.multiply(real, flag)
-    imag = tf.math.multiply(imag, flag)
+    return activation_kernel(zrelu_kernel, pair = True, jit_compile = jit_compile)(real, imag)
 
-    return real, imag
 
+def modReLU (real, imag = None, bias = None, epsilon = 1e-5, jit_compile = True):
+    '''
+    z * relu(|z| + bias) / (|z| + epsilon)
+    bias : [channels] (last axis), zeros when None
+    '''
+    bias = tf.zeros([]) if bias is None else bias
+    if imag is None:
+        return activation_kernel(modrelu_kernel, jit_compile = jit_compile)(real, bias, epsilon)
+
+    return activation_kernel(modrelu_kernel, pair = True, jit_compile = jit_compile)(real, imag, bias, epsilon)
 
-def modReLU (real, imag):
-    
-    norm = tf.abs(tf.complex(real, imag))
-    bias = tf.Variable(np.zeros([norm.get_shape()[-1]]), trainable = True, dtype=tf.float32)
-    relu = tf.nn.relu(norm + bias)
-    
-    real = tf.math.multiply(relu / norm + (1e+5), real)
-    imag = tf.math.multiply(relu / norm + (1e+5), imag)
-    
-    return real, imag
 
+def CLeaky_ReLU (real, imag = None, alpha = 0.2):
 
-def CLeaky_ReLU (real, imag):
+    if imag is None:
+        return on_parts(lambda real, imag: CLeaky_ReLU(real, imag, alpha), real)
 
-    real = tf.nn.leaky_relu(real)
-    imag = tf.nn.leaky_relu(imag)
+    real = tf.nn.leaky_relu(real, alpha = alpha)
+    imag = tf.nn.leaky_relu(imag, alpha = alpha)
 
     return real, imag
 
 
-def complex_tanh (real, imag):
+def complex_tanh (real, imag = None):
+
+    if imag is None:
+        return on_parts(complex_tanh, real)
 
     real = tf.nn.tanh(real)
     imag = tf.nn.tanh(imag)
@@ -62,9 +164,175 @@ def complex_tanh (real, imag):
     return real, imag
 
 
-def complex_softmax (real, imag):
-    
-    magnitude = tf.abs(tf.complex(real, imag))
-    magnitude = tf.keras.layers.Softmax()(magnitude)
-    
-    return magnitude
\ No newline at end of file
+def complex_softmax (real, imag = None, axis = -1, jit_compile = True):
+
+    'softmax of the magnitude, float32 for half precision inputs'
+    if imag is None:
+        return activation_kernel(softmax_kernel, jit_compile = jit_compile)(real, axis)
+
+    return activation_kernel(softmax_kernel, pair = True, jit_compile = jit_compile)(real, imag, axis)
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+ACTIVATION LAYERS, call (real_inputs, imag_inputs = None) like complex_layers.networks
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+class complex_Activation (tf.keras.layers.Layer):
+
+    'base of the stateless activation layers, activation is one of the functions above'
+    activation = None
+
+    def call (self, real_inputs, imag_inputs = None):
+
+        if imag_inputs is None:
+            return type(self).activation(real_inputs)
+
+        real_inputs, imag_inputs = cast_pair(real_inputs, imag_inputs, self.compute_dtype)
+        return type(self).activation(real_inputs, imag_inputs)
+
+
+'COMPLEX FLATTEN'
+class complex_Flatten (complex_Activation):
+
+    activation = complex_flatten
+
+
+'COMPLEX CReLU'
+class complex_CReLU (complex_Activation):
+
+    activation = CReLU
+
+
+'COMPLEX zReLU'
+class complex_zReLU (tf.keras.layers.Layer):
+
+    'jit_compile = True : the mask runs as one XLA kernel, see FUSED KERNELS'
+    def __init__ (self, jit_compile = True, **kwargs):
+
+        super(complex_zReLU, self).__init__(**kwargs)
+        self.jit_compile = jit_compile
+
+
+    def call (self, real_inputs, imag_inputs = None):
+
+        if imag_inputs is None:
+            return zReLU(real_inputs, jit_compile = self.jit_compile)
+
+        real_inputs, imag_inputs = cast_pair(real_inputs, imag_inputs, self.compute_dtype)
+        return zReLU(real_inputs, imag_inputs, jit_compile = self.jit_compile)
+
+
+    def get_config (self):
+        config = {'jit_compile': self.jit_compile}
+        base_config = super(complex_zReLU, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
+
+'COMPLEX TANH'
+class complex_Tanh (complex_Activation):
+
+    activation = complex_tanh
+
+
+'COMPLEX LEAKY ReLU'
+class complex_LeakyReLU (tf.keras.layers.Layer):
+
+    def __init__ (self, alpha = 0.2, **kwargs):
+
+        super(complex_LeakyReLU, self).__init__(**kwargs)
+        self.alpha = alpha
+
+
+    def call (self, real_inputs, imag_inputs = None):
+
+        if imag_inputs is None:
+            return CLeaky_ReLU(real_inputs, alpha = self.alpha)
+
+        real_inputs, imag_inputs = cast_pair(real_inputs, imag_inputs, self.compute_dtype)
+        return CLeaky_ReLU(real_inputs, imag_inputs, alpha = self.alpha)
+
+
+    def get_config (self):
+        config = {'alpha': self.alpha}
+        base_config = super(complex_LeakyReLU, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
+
+'COMPLEX SOFTMAX'
+class complex_Softmax (tf.keras.layers.Layer):
+
+    'softmax of the magnitude, returns one real tensor'
+    def __init__ (self, axis = -1, jit_compile = True, **kwargs):
+
+        super(complex_Softmax, self).__init__(**kwargs)
+        self.axis        = axis
+        self.jit_compile = jit_compile
+
+
+    def call (self, real_inputs, imag_inputs = None):
+
+        if imag_inputs is None:
+            return complex_softmax(real_inputs, axis = self.axis, jit_compile = self.jit_compile)
+
+        real_inputs, imag_inputs = cast_pair(real_inputs, imag_inputs, self.compute_dtype)
+        return tf.cast(complex_softmax(real_inputs, imag_inputs, axis = self.axis, jit_compile = self.jit_compile), self.compute_dtype)
+
+
+    def get_config (self):
+        config = {'axis': self.axis,
+            'jit_compile': self.jit_compile}
+        base_config = super(complex_Softmax, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
+
+'COMPLEX modReLU'
+class complex_modReLU (tf.keras.layers.Layer):
+    """
+    z * relu(|z| + b) / (|z| + epsilon), one trainable bias b per channel (last axis)
+    The bias is created once in build, not on every call.
+    jit_compile = True : magnitude, scale and both products run as one XLA kernel, see FUSED KERNELS
+    """
+    def __init__ (self, bias_initializer = 'zeros',
+                        bias_regularizer = None,
+                        bias_constraint  = None,
+                        epsilon          = 1e-5,
+                        jit_compile      = True,
+                        **kwargs):
+
+        super(complex_modReLU, self).__init__(**kwargs)
+
+        self.bias_initializer = initializers.get(bias_initializer)
+        self.bias_regularizer = regularizers.get(bias_regularizer)
+        self.bias_constraint  = constraints.get(bias_constraint)
+        self.epsilon          = epsilon
+        self.jit_compile      = jit_compile
+
+
+    def build (self, inputs_shape):
+
+        self.bias = self.add_weight(name = 'bias',
+                                    shape = (inputs_shape[-1],),
+                                    initializer = self.bias_initializer,
+                                    regularizer = self.bias_regularizer,
+                                    constraint  = self.bias_constraint,
+                                    trainable   = True)
+
+        super(complex_modReLU, self).build(inputs_shape)
+
+
+    def call (self, real_inputs, imag_inputs = None):
+
+        if imag_inputs is None:
+            return modReLU(real_inputs, bias = self.bias, epsilon = self.epsilon, jit_compile = self.jit_compile)
+
+        real_inputs, imag_inputs = cast_pair(real_inputs, imag_inputs, self.compute_dtype)
+        return modReLU(real_inputs, imag_inputs, bias = self.bias, epsilon = self.epsilon, jit_compile = self.jit_compile)
+
+
+    def get_config (self):
+        config = {'bias_initializer': initializers.serialize(self.bias_initializer),
+            'bias_regularizer': regularizers.serialize(self.bias_regularizer),
+            'bias_constraint':  constraints .serialize(self.bias_constraint),
+            'epsilon': self.epsilon,
+            'jit_compile': self.jit_compile}
+        base_config = super(complex_modReLU, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
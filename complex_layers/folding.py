@@ -0,0 +1,175 @@
+import numpy as np
+import tensorflow as tf
+
+from complex_layers.networks import *
+from complex_layers.normalization import *
+"""
+Inference-time folding of complex batch normalization into the preceding complex layer.
+
+At inference a complex batch norm is the fixed per-channel map (complex_FusedBatchNorm.inference_affine)
+    real_outputs = Mrr * real + Mri * imag + shift_real
+    imag_outputs = Mir * real + Mii * imag + shift_imag
+M = gamma . W is a general real 2x2 map, so it is folded into the real block kernel on [xr, xi]
+    [xr, xi] * [[ Mrr Wr + Mri Wi,  Mir Wr + Mii Wi],
+                [ Mri Wr - Mrr Wi,  Mii Wr - Mir Wi]]
+The folded layer is a copy of the layer in the {"folded" : True} inference form (see complex_BlockKernel),
+one real convolution (GEMM for complex_Dense) instead of four, and freeze_for_inference returns
+a new model without the batch norm layers. The original model and its weights are not changed.
+"""
+
+
+'layers with a block kernel inference form'
+FOLDABLE_LAYERS = (complex_Dense, complex_Conv1D, complex_Conv2D, complex_Conv3D)
+
+
+def fold_complex_kernel (kernel, bias, Mrr, Mri, Mir, Mii, shift_real, shift_imag):
+    '''
+    kernel : [..., 2 * in, 2 * out] block kernel, bias : [2 * out], real outputs first
+    Mrr, Mri, Mir, Mii, shift_real, shift_imag : [out]
+    returns kernel : [..., 2 * in, 2 * out], bias : [2 * out] of the block kernel followed by the 2x2 map
+    '''
+    real_kernel, imag_kernel = tf.split(kernel, 2, axis = -1)
+    real_bias, imag_bias = tf.split(bias, 2)
+
+    kernel = tf.concat([Mrr * real_kernel + Mri * imag_kernel, Mir * real_kernel + Mii * imag_kernel], axis = -1)
+    bias   = tf.concat([Mrr * real_bias + Mri * imag_bias + shift_real, Mir * real_bias + Mii * imag_bias + shift_imag], axis = 0)
+
+    return kernel, bias
+
+
+def fold_batchnorm (layer, batchnorm):
+    '''
+    layer     : built complex_Dense, complex_Conv1D, complex_Conv2D or complex_Conv3D without activation
+    batchnorm : built complex_FusedBatchNorm (or complex_BatchNorm) normalizing the layer outputs on the last axis
+    returns a new folded layer computing batchnorm(layer(inputs)) with the inference statistics, see complex_BlockKernel.
+    Only valid for inference, the folded layer is not trained.
+    '''
+    if type(layer) not in FOLDABLE_LAYERS:
+        raise ValueError('Can not fold a batch norm into ' + type(layer).__name__ + ', expected one of ' + str([foldable.__name__ for foldable in FOLDABLE_LAYERS]) + '.')
+    if layer.activation is not None:
+        raise ValueError('Can not fold a batch norm into ' + layer.name + ', the activation runs between the layer and the batch norm.')
+    if not block_foldable(layer):
+        raise ValueError('Can not fold a batch norm into ' + layer.name + ', the block kernel needs groups = 1 and channels_last.')
+
+    affine = [tf.cast(parameter, tf.float32) for parameter in batchnorm.inference_affine()]
+    kernel, bias = fold_complex_kernel(*layer.block_weights(), *affine)
+
+    return layer.inference_layer(kernel, bias)
+
+
+def rebuild_model (model, replacements):
+    '''
+    model        : functional tf.keras.Model
+    replacements : {layer : new layer}, a None new layer removes the layer, its outputs are then its inputs
+    returns a new functional model on the inputs of model, every other layer is shared with model
+    '''
+    tensors = dict((id(tensor), tensor) for tensor in model.inputs)
+
+    def rebuilt (value):
+        return tensors.get(id(value), value)
+
+    for depth in sorted(model._nodes_by_depth, reverse = True):
+        for node in model._nodes_by_depth[depth]:
+            if node.is_input:
+                continue
+
+            layer = replacements.get(node.layer, node.layer)
+            if layer is None:
+                outputs = tf.nest.pack_sequence_as(node.outputs, [rebuilt(tensor) for tensor in node.keras_inputs])
+            else:
+                args, kwargs = tf.nest.map_structure(rebuilt, (node.call_args, node.call_kwargs))
+                outputs = layer(*args, **kwargs)
+
+            for tensor, output in zip(tf.nest.flatten(node.outputs), tf.nest.flatten(outputs)):
+                tensors[id(tensor)] = output
+
+    return tf.keras.Model(inputs = model.inputs, outputs = [rebuilt(tensor) for tensor in model.outputs], name = model.name)
+
+
+def producer (node):
+
+    'the only layer (and its node) whose outputs feed node, None if node has several producers'
+    layers = set(tensor._keras_history.layer for tensor in node.keras_inputs)
+    if len(layers) != 1:
+        return None, None
+
+    layer = layers.pop()
+    if len(layer.inbound_nodes) != 1:
+        return None, None
+
+    return layer, layer.inbound_nodes[0]
+
+
+def only_consumer (model, layer, node):
+
+    'True when every output of layer is used by node alone, and is not a model output'
+    model_outputs = [id(tensor) for tensor in model.outputs]
+    layer_outputs = [id(tensor) for tensor in tf.nest.flatten(layer.inbound_nodes[0].outputs)]
+    return all(outbound_node is node for outbound_node in layer.outbound_nodes) and not set(model_outputs) & set(layer_outputs)
+
+
+def freeze_for_inference (model):
+    '''
+    model : functional tf.keras.Model
+    Finds every complex batch norm fed only by a complex_Dense, complex_Conv1D, complex_Conv2D or complex_Conv3D
+        real, imag = complex_Conv2D(...)(real, imag)
+        real, imag = complex_BatchNormalization2D(real, imag)
+    or  outputs    = complex_BatchNorm2D()(tf.concat([real, imag], -1))
+    returns a new model where the layer is its folded copy (fold_batchnorm) and the batch norm is removed.
+    model is not changed, the new model shares its other layers and is only for inference.
+    '''
+    replacements = {}
+    for batchnorm in model.layers:
+        if not isinstance(batchnorm, complex_FusedBatchNorm) or len(batchnorm.inbound_nodes) != 1:
+            continue
+
+        node = batchnorm.inbound_nodes[0]
+        if batchnorm.axis not in [-1, len(node.keras_inputs[0].shape) - 1]:
+            continue
+
+        layer, layer_node = producer(node)
+        if isinstance(batchnorm, complex_BatchNorm) and layer is not None:
+            'tf.concat([real, imag], -1) between the layer and complex_BatchNorm, it then concatenates the folded outputs'
+            if not only_consumer(model, layer, node):
+                continue
+            node = layer_node
+            layer, layer_node = producer(node)
+
+        if type(layer) not in FOLDABLE_LAYERS or layer in replacements or layer.activation is not None or not block_foldable(layer) or not only_consumer(model, layer, node):
+            continue
+        if [id(tensor) for tensor in node.keras_inputs] != [id(tensor) for tensor in tf.nest.flatten(layer_node.outputs)]:
+            continue
+
+        replacements[layer]     = fold_batchnorm(layer, batchnorm)
+        replacements[batchnorm] = None
+
+    return rebuild_model(model, replacements)
+
+
+if __name__ == "__main__":
+    '''
+    freeze_for_inference Test,
+    folded model outputs must be same as the batch norm model outputs on the moving statistics,
+    momentum = 1.0 keeps the moving statistics fixed while the batch norm model runs
+    '''
+    real_inputs = tf.keras.Input(shape = (32, 32, 2))
+    imag_inputs = tf.keras.Input(shape = (32, 32, 2))
+    real, imag = complex_Conv2D(filters = 8, strides = (1, 1), bias_initializer = 'glorot_uniform')(real_inputs, imag_inputs)
+    real, imag = complex_FusedBatchNorm(momentum = 1.0)(real, imag)
+    real, imag = complex_Conv1D(filters = 8, kernel_size = 3)(tf.reshape(real, [-1, 32 * 32, 8]), tf.reshape(imag, [-1, 32 * 32, 8]))
+    outputs    = complex_BatchNorm(momentum = 1.0)(tf.concat([real, imag], axis = -1))
+    real, imag = tf.split(outputs, 2, axis = -1)
+    real, imag = complex_Dense(units = 4)(real, imag)
+    real, imag = complex_FusedBatchNorm(momentum = 1.0)(real, imag)
+    model = tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+
+    'random statistics, so that every batch norm is a non trivial map'
+    for layer in model.layers:
+        if isinstance(layer, complex_FusedBatchNorm):
+            layer.set_weights([np.random.uniform(0.5, 1.5, weight.shape) if 'V' in weight.name and 'Vri' not in weight.name else np.random.uniform(-0.3, 0.3, weight.shape) for weight in layer.weights])
+
+    inputs  = [tf.random.normal([2, 32, 32, 2]), tf.random.normal([2, 32, 32, 2])]
+    frozen  = freeze_for_inference(model)
+    print("batch norms left :", [layer.name for layer in frozen.layers if isinstance(layer, complex_FusedBatchNorm)])
+    for bn_outputs, folded_outputs in zip(model(inputs), frozen(inputs)):
+        print(folded_outputs.shape, np.allclose(bn_outputs, folded_outputs, atol = 1e-4))
@@ -0,0 +1,346 @@
+"""
+Opt-in per-layer FLOP, latency and activation memory instrumentation
+
+    enable_instrumentation()
+    outputs = model([real, imag])              # eager calls are recorded
+    instrumentation_report(model)              # model.summary() like table, returns the rows
+    disable_instrumentation()
+
+or  with instrumentation():
+        ...
+
+enable_instrumentation wraps the call method of every layer class of complex_layers and spectral_layers,
+disable_instrumentation puts the original methods back, so with instrumentation off the layers run
+their own call with no wrapper and no flag check (zero overhead).
+
+Per layer and per call:
+    flops            : analytic count, a multiply-add is 2 FLOPs.
+                       A four-convolution complex layer costs four real layers, gauss = True three,
+                       STFT_network / ISTFT_network the DFT matmul (conv engines) or rfft / irfft (fft engine).
+    time             : wall-clock of the call.
+    activation bytes : bytes of the outputs.
+Eager calls only : inside tf.function (model.fit, predict, a traced model) the Python call runs once per trace,
+so graph calls are not recorded and a layer called in graph mode warns once (RuntimeWarning),
+use run_eagerly = True or call the model eagerly. Building a functional model is not a call and does not warn.
+A layer calling itself (complex64 inputs through call_on_complex, super().call) is recorded once.
+"""
+import time
+import inspect
+import weakref
+import warnings
+import functools
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+from complex_layers import networks
+from complex_layers import recurrent
+from complex_layers import activations
+from complex_layers import normalization
+from spectral_layers import STFT
+
+
+INSTRUMENTED_MODULES = [networks, activations, normalization, recurrent, STFT]
+
+_records  = weakref.WeakKeyDictionary()
+_warned   = weakref.WeakSet()
+_patched  = {}
+_state    = threading.local()
+
+
+def elements (tensor):
+
+    'number of elements, an unknown dimension counts as 1'
+    return int(np.prod([dimension if dimension is not None else 1 for dimension in tensor.shape]))
+
+
+def fft_flops (length):
+
+    'real-input FFT of length points, half of the 5 N log2 N complex FFT'
+    return 2.5 * length * np.log2(length)
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+ANALYTIC FLOP COUNTERS, (layer, inputs, outputs, kwargs) -> FLOPs of one call
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+def complex_products (layer):
+
+    'real products per complex product : four, three for the Gauss trick, four for the block kernel of an inference form'
+    if getattr(layer, "inference", None) is None and getattr(layer, "gauss", False):
+        return 3
+    return 4
+
+
+def dense_flops (layer, inputs, outputs, kwargs):
+
+    return complex_products(layer) * 2 * elements(outputs[0]) * inputs[0].shape[-1]
+
+
+def input_channels (layer, inputs):
+
+    'input channels seen by one filter, in / groups'
+    channels = inputs[0].shape[-1] if getattr(layer, "data_format", "channels_last") == "channels_last" else inputs[0].shape[1]
+    return channels // getattr(layer, "groups", 1)
+
+
+def convolution_flops (layer, inputs, outputs, kwargs):
+
+    'per real convolution : 2 * output elements * kernel elements * input channels per group'
+    kernel_size = np.prod(np.atleast_1d(layer.kernel_size))
+    return complex_products(layer) * 2 * elements(outputs[0]) * kernel_size * input_channels(layer, inputs)
+
+
+def depthwise_flops (layer, inputs, outputs, kwargs):
+
+    'per real depthwise convolution : 2 * output elements * kernel elements'
+    return 4 * 2 * elements(outputs[0]) * np.prod(np.atleast_1d(layer.kernel_size))
+
+
+def composite_flops (layer, inputs, outputs, kwargs):
+
+    'the depthwise and pointwise sub layers of a separable convolution are recorded on their own rows'
+    return 0
+
+
+def transpose_convolution_flops (layer, inputs, outputs, kwargs):
+
+    'per real transposed convolution : 2 * input elements * kernel elements * filters'
+    kernel_size = np.prod(np.atleast_1d(layer.kernel_size))
+    return complex_products(layer) * 2 * elements(inputs[0]) * kernel_size * layer.filters
+
+
+def pooling_flops (layer, inputs, outputs, kwargs):
+
+    return 2 * elements(outputs[0]) * np.prod(np.atleast_1d(layer.pool_size))
+
+
+def global_pooling_flops (layer, inputs, outputs, kwargs):
+
+    'square, add and compare (max) or add (average) on every input element'
+    return 3 * elements(inputs[0])
+
+
+def normalization_flops (layer, inputs, outputs, kwargs):
+    '''
+    per complex element : 8 for the 2x2 map and shift (4 multiplies, 4 adds),
+    8 more for the statistics (sums of real, imag, real^2, imag^2, real * imag) when they are computed
+    '''
+    statistics = True
+    if isinstance(layer, normalization.complex_FusedBatchNorm):
+        statistics = bool(kwargs.get("training", False))
+    if isinstance(layer, normalization.complex_BatchNorm):
+        return (8 + 8 * statistics) * elements(outputs[0]) // 2
+
+    return (8 + 8 * statistics) * elements(outputs[0])
+
+
+def naive_normalization_flops (layer, inputs, outputs, kwargs):
+
+    'two real batch norms, 4 per element plus 3 for the statistics in training'
+    return 2 * (4 + 3 * bool(kwargs.get("training", True))) * elements(outputs[0])
+
+
+def stft_flops (layer, inputs, outputs, kwargs):
+
+    'frames = batch_size * time_step'
+    frames = elements(outputs[0]) // layer.frequency_bin
+    if layer.engine == "fft":
+        return frames * (layer.window_length + fft_flops(layer.window_length))
+    return frames * 2 * layer.window_length * 2 * layer.frequency_bin
+
+
+def istft_flops (layer, inputs, outputs, kwargs):
+
+    'frames = batch_size * time_step, overlap-add adds every windowed frame once'
+    frames = elements(inputs[0]) // inputs[0].shape[-1]
+    if layer.engine == "fft":
+        return frames * (2 * layer.window_length + fft_flops(layer.window_length))
+    return frames * 2 * layer.window_length * 2 * layer.cut_off
+
+
+def recurrent_flops (layer, inputs, outputs, kwargs):
+
+    'per time step : input projection and recurrent block GEMMs for every gate, about 4 FLOPs per gate element'
+    steps   = elements(inputs[0]) // inputs[0].shape[-1]
+    columns = 2 * layer.gates * layer.units
+    return steps * (2 * 2 * inputs[0].shape[-1] * columns + 2 * 2 * layer.units * columns + 4 * columns)
+
+
+def elementwise_flops (layer, inputs, outputs, kwargs):
+
+    'activation layers : a few operations per output element, counted as 1 per element per output tensor'
+    return sum(elements(output) for output in outputs)
+
+
+'most derived class first, subclasses (complex_BatchNorm, STFT_stream, ...) use their base class counter'
+FLOP_COUNTERS = [(networks.complex_Dense,                        dense_flops),
+                 (networks.complex_Conv3DTranspose,              transpose_convolution_flops),
+                 (networks.complex_Conv2DTranspose,              transpose_convolution_flops),
+                 (networks.complex_Conv1DTranspose,              transpose_convolution_flops),
+                 (networks.complex_Conv3D,                       convolution_flops),
+                 (networks.complex_Conv2D,                       convolution_flops),
+                 (networks.complex_Conv1D,                       convolution_flops),
+                 (networks.complex_DepthwiseConv,                depthwise_flops),
+                 (networks.complex_SeparableConv,                composite_flops),
+                 (networks.complex_GlobalPooling,                global_pooling_flops),
+                 (networks.complex_Pooling,                      pooling_flops),
+                 (normalization.complex_NaiveBatchNormalization, naive_normalization_flops),
+                 (normalization.complex_FusedBatchNorm,          normalization_flops),
+                 (normalization.complex_GroupNorm,               normalization_flops),
+                 (STFT.STFT_network,                             stft_flops),
+                 (STFT.ISTFT_network,                            istft_flops),
+                 (recurrent.complex_RNN,                         recurrent_flops)]
+
+
+def count_flops (layer, inputs, outputs, kwargs):
+
+    for layer_class, counter in FLOP_COUNTERS:
+        if isinstance(layer, layer_class):
+            return int(counter(layer, inputs, outputs, kwargs))
+
+    return int(elementwise_flops(layer, inputs, outputs, kwargs))
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+RECORDING
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+def instrumented_call (call):
+
+    @functools.wraps(call)
+    def wrapper (self, *args, **kwargs):
+
+        active = _state.__dict__.setdefault("active", set())
+        if id(self) in active:
+            return call(self, *args, **kwargs)
+        if not tf.executing_eagerly():
+            graph_call_warning(self)
+            return call(self, *args, **kwargs)
+
+        active.add(id(self))
+        try:
+            start   = time.perf_counter()
+            outputs = call(self, *args, **kwargs)
+            seconds = time.perf_counter() - start
+        finally:
+            active.discard(id(self))
+
+        inputs  = [tensor for tensor in tf.nest.flatten(args) if tf.is_tensor(tensor)]
+        flat    = [tensor for tensor in tf.nest.flatten(outputs) if tf.is_tensor(tensor)]
+        record  = _records.setdefault(self, {"calls" : 0, "seconds" : 0.0, "flops" : 0, "activation_bytes" : 0})
+        record["calls"]            += 1
+        record["seconds"]          += seconds
+        record["flops"]            += count_flops(self, inputs, flat, kwargs)
+        record["activation_bytes"] += sum(elements(tensor) * tensor.dtype.size for tensor in flat)
+
+        return outputs
+
+    'Keras reads the call signature (training, mask arguments) of layers built while instrumentation is on'
+    wrapper.__signature__ = inspect.signature(call)
+    return wrapper
+
+
+def graph_call_warning (layer):
+
+    'Keras traces a functional model in a "<layer>_scratch_graph" when it is built, that is not a call'
+    if layer in _warned or tf.compat.v1.get_default_graph().name.endswith("_scratch_graph"):
+        return
+
+    _warned.add(layer)
+    warnings.warn(layer.name + ' (' + type(layer).__name__ + ') was called in graph mode (tf.function, model.fit, predict), '
+                  'instrumentation records eager calls only, this call is not recorded. Use run_eagerly = True or call the model eagerly.', RuntimeWarning)
+
+
+def layer_classes ():
+
+    'every Layer class defined in INSTRUMENTED_MODULES, with its own call'
+    for module in INSTRUMENTED_MODULES:
+        for _, layer_class in inspect.getmembers(module, inspect.isclass):
+            if issubclass(layer_class, tf.keras.layers.Layer) and layer_class.__module__ == module.__name__ and "call" in layer_class.__dict__:
+                yield layer_class
+
+
+def enable_instrumentation ():
+
+    for layer_class in layer_classes():
+        if layer_class not in _patched:
+            _patched[layer_class] = layer_class.__dict__["call"]
+            layer_class.call = instrumented_call(_patched[layer_class])
+
+
+def disable_instrumentation ():
+
+    'the original call methods are put back, instrumentation off costs nothing'
+    for layer_class, call in list(_patched.items()):
+        layer_class.call = call
+        del _patched[layer_class]
+
+
+def reset_instrumentation ():
+
+    _records.clear()
+    _warned.clear()
+
+
+class instrumentation (object):
+
+    'with instrumentation(): ... enables the instrumentation inside the block'
+    def __enter__ (self):
+        enable_instrumentation()
+        return self
+
+    def __exit__ (self, *exception):
+        disable_instrumentation()
+
+
+def instrumentation_report (model = None, print_fn = print, line_length = 120):
+    '''
+    model : the layers of model (any depth) that were recorded, None for every recorded layer
+    Rows are in order of the first recorded call. Prints a model.summary() like table and returns one dict per layer
+        name, type, calls, flops, seconds, activation_bytes (totals), and the per call averages
+    '''
+    submodules = set(id(layer) for layer in model.submodules) if model is not None else None
+    layers     = [layer for layer in list(_records.keys()) if submodules is None or id(layer) in submodules]
+
+    rows = []
+    for layer in layers:
+        record = _records[layer]
+        calls  = max(record["calls"], 1)
+        rows.append({"name"                      : layer.name,
+                     "type"                      : type(layer).__name__,
+                     "calls"                     : record["calls"],
+                     "flops"                     : record["flops"],
+                     "seconds"                   : record["seconds"],
+                     "activation_bytes"          : record["activation_bytes"],
+                     "flops_per_call"            : record["flops"] / calls,
+                     "milliseconds_per_call"     : 1e+3 * record["seconds"] / calls,
+                     "activation_bytes_per_call" : record["activation_bytes"] / calls})
+
+    if print_fn is None:
+        return rows
+
+    total_seconds = sum(row["seconds"] for row in rows) or 1.0
+    columns = [0.40, 0.08, 0.16, 0.12, 0.14, 0.10]
+    positions = np.cumsum([int(line_length * column) for column in columns])
+
+    def print_row (fields):
+        line = ""
+        for field, position in zip(fields, positions):
+            line = (line + str(field))[:position - 1]
+            line = line + " " * (position - len(line))
+        print_fn(line)
+
+    print_fn("_" * line_length)
+    print_row(["Layer (type)", "Calls", "MFLOPs / call", "ms / call", "Activation KB", "% time"])
+    print_fn("=" * line_length)
+    for row in rows:
+        print_row([row["name"] + " (" + row["type"] + ")", row["calls"], "%.3f" % (row["flops_per_call"] / 1e+6),
+                   "%.3f" % row["milliseconds_per_call"], "%.1f" % (row["activation_bytes_per_call"] / 1024), "%.1f" % (100 * row["seconds"] / total_seconds)])
+        print_fn("_" * line_length)
+    print_fn("Total MFLOPs: %.3f" % (sum(row["flops"] for row in rows) / 1e+6))
+    print_fn("Total time: %.3f ms" % (1e+3 * sum(row["seconds"] for row in rows)))
+    print_fn("Total activation: %.1f KB" % (sum(row["activation_bytes"] for row in rows) / 1024))
+    print_fn("_" * line_length)
+
+    return rows
+
@@ -0,0 +1,291 @@
+import numpy as np
+import tensorflow as tf
+
+from complex_layers.networks import *
+from complex_layers.activations import *
+from complex_layers.folding import FOLDABLE_LAYERS, rebuild_model
+"""
+Magnitude pruning of complex_Dense, complex_Conv1D, complex_Conv2D and complex_Conv3D
+
+    model.fit(..., callbacks = [complex_Pruning(pruning_schedule(final_sparsity = 0.9), structured = True)])
+    sparse_model = sparsify_for_inference(model)   # pruned filters are dropped, very sparse complex_Dense run sparse GEMMs
+
+A complex weight w = Wr + i Wi is ranked by its magnitude |w| = sqrt(Wr^2 + Wi^2), and Wr and Wi are zeroed together,
+so a pruned weight is a zero complex weight (pruning Wr and Wi on their own leaves half complex weights).
+    unstructured : the weights with the smallest |w|
+    structured   : the filters (output channels, units) with the smallest sqrt(sum |w|^2)
+
+Zeros alone are not faster, sparsify_for_inference replaces every pruned layer by a copy in an inference form
+(see complex_BlockKernel, the form is in get_config, so the sparse model saves and reloads)
+    pruned filters : "kept_filters", the kernel keeps only the other filters, one smaller convolution / GEMM,
+                     the outputs of a pruned filter are its bias (expand_filters)
+    sparse kernel  : "sparse_entries", complex_Dense with a kernel sparsity above sparse_threshold runs tf.sparse.sparse_dense_matmul.
+                     A sparse GEMM beats the dense GEMM from about 90 % zeros on CPU, there is no sparse convolution,
+                     so unstructured convolution kernels keep the dense convolution.
+A quantized layer keeps its int8 kernel with the pruned filters dropped, the sparse values are float (not quantized).
+"""
+
+
+'the prunable layers, the same as the foldable layers'
+PRUNABLE_LAYERS = FOLDABLE_LAYERS
+
+
+def complex_kernels (layer):
+
+    'the real and imag kernel variables of layer, [..., in, filters]'
+    real_layer, imag_layer = (getattr(layer, name) for name in layer.complex_sublayers)
+    return real_layer.kernel, imag_layer.kernel
+
+
+def complex_magnitude (real_kernel, imag_kernel):
+
+    'sqrt(Wr^2 + Wi^2) in float32'
+    real_kernel, imag_kernel = tf.cast(real_kernel, tf.float32), tf.cast(imag_kernel, tf.float32)
+    return tf.sqrt(real_kernel * real_kernel + imag_kernel * imag_kernel)
+
+
+def magnitude_mask (real_kernel, imag_kernel, sparsity, structured = False):
+    '''
+    real_kernel, imag_kernel : [..., in, filters]
+    returns a float32 mask of the kernel shape, 0 for the sparsity fraction of the smallest complex weights
+    (structured = True : of the filters with the smallest complex L2 norm), shared by Wr and Wi
+    '''
+    magnitude = complex_magnitude(real_kernel, imag_kernel)
+
+    if structured:
+        norms  = tf.sqrt(tf.reduce_sum(tf.square(magnitude), axis = list(range(magnitude.shape.rank - 1))))
+        pruned = int(round(sparsity * norms.shape[0]))
+        kept   = tf.argsort(norms)[pruned:]
+        mask   = tf.scatter_nd(kept[:, None], tf.ones_like(kept, tf.float32), norms.shape)
+        return tf.broadcast_to(mask, magnitude.shape)
+
+    flat   = tf.reshape(magnitude, [-1])
+    pruned = int(round(sparsity * flat.shape[0]))
+    kept   = tf.argsort(flat)[pruned:]
+    mask   = tf.scatter_nd(kept[:, None], tf.ones_like(kept, tf.float32), flat.shape)
+    return tf.reshape(mask, magnitude.shape)
+
+
+def apply_mask (layer, mask):
+
+    'zeroes Wr and Wi where mask is 0'
+    for kernel in complex_kernels(layer):
+        kernel.assign(kernel * tf.cast(mask, kernel.dtype))
+
+
+def prune_layer (layer, sparsity, structured = False):
+    '''
+    layer : built complex_Dense, complex_Conv1D, complex_Conv2D or complex_Conv3D
+    One shot magnitude pruning of the kernels of layer, returns the mask
+    '''
+    if type(layer) not in PRUNABLE_LAYERS:
+        raise ValueError('Can not prune ' + type(layer).__name__ + ', expected one of ' + str([prunable.__name__ for prunable in PRUNABLE_LAYERS]) + '.')
+
+    mask = magnitude_mask(*complex_kernels(layer), sparsity, structured = structured)
+    apply_mask(layer, mask)
+
+    return mask
+
+
+def kernel_sparsity (layer, structured = False):
+
+    'fraction of zero complex weights of layer in any form (structured = True : of zero filters)'
+    magnitude = complex_magnitude(*tf.split(layer.block_weights()[0], 2, axis = -1))
+    if structured:
+        magnitude = tf.reduce_max(magnitude, axis = list(range(magnitude.shape.rank - 1)))
+
+    return float(tf.reduce_mean(tf.cast(tf.equal(magnitude, 0), tf.float32)))
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+PRUNING SCHEDULE
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+class pruning_schedule (object):
+    '''
+    Polynomial sparsity schedule (Zhu & Gupta, To prune, or not to prune, 2017)
+        sparsity(step) = final + (initial - final) * (1 - (step - begin_step) / (end_step - begin_step)) ^ power
+    pruned every frequency steps between begin_step and end_step, initial_sparsity = final_sparsity is a constant sparsity
+    '''
+    def __init__ (self, final_sparsity   = 0.9,
+                        initial_sparsity = 0.0,
+                        begin_step       = 0,
+                        end_step         = 1000,
+                        frequency        = 100,
+                        power            = 3):
+
+        self.final_sparsity   = final_sparsity
+        self.initial_sparsity = initial_sparsity
+        self.begin_step       = begin_step
+        self.end_step         = end_step
+        self.frequency        = frequency
+        self.power            = power
+
+
+    def sparsity (self, step):
+
+        progress = min(1.0, max(0.0, (step - self.begin_step) / max(self.end_step - self.begin_step, 1)))
+        return self.final_sparsity + (self.initial_sparsity - self.final_sparsity) * (1.0 - progress) ** self.power
+
+
+    def __call__ (self, step):
+
+        'sparsity at step, None when the masks are not updated at step'
+        if step < self.begin_step or (step > self.end_step) or ((step - self.begin_step) % self.frequency != 0 and step != self.end_step):
+            return None
+
+        return self.sparsity(step)
+
+
+'COMPLEX PRUNING'
+class complex_Pruning (tf.keras.callbacks.Callback):
+    '''
+    schedule   : pruning_schedule, stepped on model.optimizer.iterations
+    structured : False prunes complex weights, True prunes filters
+    layers     : the layers to prune, None for every complex_Dense, complex_Conv1D, complex_Conv2D and complex_Conv3D of the model
+    The masks are updated on the steps of schedule, and applied after every training batch
+    so that the optimizer does not grow the pruned weights back.
+    '''
+    def __init__ (self, schedule, structured = False, layers = None):
+
+        super(complex_Pruning, self).__init__()
+        self.schedule   = schedule
+        self.structured = structured
+        self.layers     = layers
+        self.masks      = {}
+
+
+    def on_train_begin (self, logs = None):
+
+        if self.layers is None:
+            self.layers = [layer for layer in self.model.submodules if type(layer) in PRUNABLE_LAYERS]
+
+
+    def on_train_batch_begin (self, batch, logs = None):
+
+        sparsity = self.schedule(int(self.model.optimizer.iterations))
+        if sparsity is None:
+            return
+
+        for layer in self.layers:
+            if layer.built:
+                self.masks[layer.name] = prune_layer(layer, sparsity, structured = self.structured)
+
+
+    def on_train_batch_end (self, batch, logs = None):
+
+        for layer in self.layers:
+            if layer.name in self.masks:
+                apply_mask(layer, self.masks[layer.name])
+
+
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+SPARSE INFERENCE
+"""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""""
+def sparsified (layer):
+
+    'True when layer is an inference form with dropped filters or a sparse kernel'
+    return layer.inference is not None and (layer.inference["kept_filters"] is not None or layer.inference["sparse_entries"] is not None)
+
+
+def sparsify_layer (layer, sparse_threshold = 0.9):
+    '''
+    layer : pruned complex_Dense, complex_Conv1D, complex_Conv2D or complex_Conv3D without activation, groups = 1, channels_last
+    returns a new layer where the zero filters of the kernel are dropped, and a float complex_Dense kernel
+    with at least sparse_threshold zeros runs as a sparse GEMM. Only for inference.
+    '''
+    if type(layer) not in PRUNABLE_LAYERS:
+        raise ValueError('Can not sparsify ' + type(layer).__name__ + ', expected one of ' + str([prunable.__name__ for prunable in PRUNABLE_LAYERS]) + '.')
+    if layer.activation is not None:
+        raise ValueError('Can not sparsify ' + layer.name + ', the activation runs inside the four real layers.')
+    if not block_foldable(layer):
+        raise ValueError('Can not sparsify ' + layer.name + ', the block kernel needs groups = 1 and channels_last.')
+
+    'sparsity of the kept filters, the zero filters are dropped anyway'
+    magnitude = complex_magnitude(*tf.split(layer.block_weights()[0], 2, axis = -1))
+    magnitude = tf.boolean_mask(magnitude, tf.reduce_max(magnitude, axis = list(range(magnitude.shape.rank - 1))) > 0, axis = magnitude.shape.rank - 1)
+    sparsity  = float(tf.reduce_mean(tf.cast(tf.equal(magnitude, 0), tf.float32))) if tf.size(magnitude) > 0 else 1.0
+
+    quantized = layer.inference is not None and layer.inference["quantized"]
+    sparse    = isinstance(layer, complex_Dense) and not quantized and sparsity >= sparse_threshold
+
+    'int8 inputs stay int8 with the same calibrated scale'
+    input_scale = layer.input_scale if quantized and layer.inference["quantized_inputs"] else None
+    return layer.inference_layer(*layer.inference_weights(), quantized = quantized, drop_filters = True, sparse = sparse, input_scale = input_scale)
+
+
+def dropped_filters (layer):
+
+    'fraction of the filters of layer that are dropped'
+    return 1.0 - layer.kernel_filters() / layer.complex_filters() if layer.inference is not None else 0.0
+
+
+def sparsify_for_inference (model, sparse_threshold = 0.9):
+    '''
+    model : functional tf.keras.Model pruned by complex_Pruning or prune_layer
+    returns a new model where every built complex_Dense, complex_Conv1D, complex_Conv2D and complex_Conv3D
+    (no activation, groups = 1, channels_last) with zero weights is its sparsified copy (sparsify_layer).
+    model is not changed, the new model shares its other layers and is only for inference.
+    '''
+    replacements = {}
+    for layer in model.layers:
+        if type(layer) not in PRUNABLE_LAYERS or not layer.built or sparsified(layer):
+            continue
+        if layer.activation is not None or not block_foldable(layer) or kernel_sparsity(layer) == 0:
+            continue
+
+        replacements[layer] = sparsify_layer(layer, sparse_threshold = sparse_threshold)
+
+    return rebuild_model(model, replacements)
+
+
+if __name__ == "__main__":
+    '''
+    Pruning Test,
+    Wr and Wi are zeroed together at the scheduled sparsity, sparsified outputs must be same as the pruned dense outputs,
+    and the sparsified layers must be faster than the dense ones
+    '''
+    import time
+
+    def latency (function, inputs, iterations = 50):
+        function(*inputs)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            function(*inputs)
+        return 1e+3 * (time.perf_counter() - start) / iterations
+
+    schedule = pruning_schedule(final_sparsity = 0.9, begin_step = 0, end_step = 20, frequency = 5)
+    print("schedule :", [(step, round(schedule(step), 3)) for step in range(0, 25) if schedule(step) is not None])
+
+    'training with the pruning callback'
+    real_inputs = tf.keras.Input(shape = (16, 16, 4))
+    imag_inputs = tf.keras.Input(shape = (16, 16, 4))
+    real, imag = complex_Conv2D(filters = 16, strides = (1, 1))(real_inputs, imag_inputs)
+    real, imag = CReLU(real, imag)
+    real, imag = complex_Dense(units = 8)(real, imag)
+    model = tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+    model.compile(optimizer = "adam", loss = "mse")
+
+    inputs  = [tf.random.normal([32, 16, 16, 4]), tf.random.normal([32, 16, 16, 4])]
+    targets = [tf.random.normal([32, 16, 16, 8]), tf.random.normal([32, 16, 16, 8])]
+    model.fit(inputs, targets, batch_size = 4, epochs = 3, verbose = 0, callbacks = [complex_Pruning(schedule)])
+    for layer in model.layers[2:]:
+        if type(layer) in PRUNABLE_LAYERS:
+            real_kernel, imag_kernel = complex_kernels(layer)
+            print(layer.name, "sparsity %.3f" % kernel_sparsity(layer), "Wr and Wi zero together :",
+                  bool(np.all(np.equal(real_kernel.numpy() == 0, imag_kernel.numpy() == 0))))
+
+    'structured pruning drops filters, unstructured complex_Dense runs a sparse GEMM'
+    for structured, layer, shape in [(True, complex_Conv2D(filters = 128, strides = (1, 1)), [16, 32, 32, 64]),
+                                     (True, complex_Conv1D(filters = 256, kernel_size = 3), [16, 256, 128]),
+                                     (True, complex_Dense(units = 1024), [256, 1024]),
+                                     (False, complex_Dense(units = 1024), [256, 1024])]:
+        inputs = [tf.random.normal(shape), tf.random.normal(shape)]
+        layer(*inputs)
+        prune_layer(layer, 0.9 if structured else 0.95, structured = structured)
+        call = tf.function(layer.call)
+        outputs, dense_ms = call(*inputs), latency(call, inputs)
+        sparse_layer = sparsify_layer(layer)
+        call = tf.function(sparse_layer.call)
+        print(layer.name, "structured" if structured else "sparse GEMM", "dropped %.2f" % dropped_filters(sparse_layer),
+              [np.allclose(dense, sparse, atol = 1e-4) for dense, sparse in zip(outputs, call(*inputs))],
+              "dense %.3f ms, sparsified %.3f ms" % (dense_ms, latency(call, inputs)))
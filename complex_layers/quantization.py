@@ -0,0 +1,220 @@
+import numpy as np
+import tensorflow as tf
+
+from complex_layers.utils import *
+from complex_layers.networks import *
+from complex_layers.activations import *
+from complex_layers.folding import FOLDABLE_LAYERS, rebuild_model
+"""
+Int8 post-training quantization of complex_Dense, complex_Conv1D, complex_Conv2D and complex_Conv3D
+
+    quantized = quantize_model(model)                                                   # int8 weights
+    quantized = quantize_model(model, representative_dataset = calibration_dataset)     # int8 weights and inputs
+    reference = model_outputs(model, validation_dataset)                                # float outputs
+    accuracy_report(quantized, validation_dataset, reference)                           # quantized against float, per model output
+
+Weights : the real and imag kernels are stored once each in int8 (the block kernel of a folded layer),
+          symmetric per filter. Filter o has one scale for its real and its imag kernel, max(|Wr[..., o]|, |Wi[..., o]|) / 127.
+          The quantized layer is a copy in the {"quantized" : True} inference form (see complex_BlockKernel),
+          the float kernels are not kept, so the kernels are 4x smaller in memory and on disk.
+Call    : without representative_dataset the int8 kernels are dequantized and the [xr, xi] block convolution (GEMM) runs in float.
+          With representative_dataset every layer gets one input scale, max(|xr|, |xi|) / 127 of its inputs in the float model
+          (input_scales). The layer quantizes [xr ; xi] to int8 and runs one int8 x int8 GEMM / convolution with int32
+          accumulation with [Wr, Wi] (TensorFlow QuantizedMatMul, QuantizedConv2D). One float rescale by input_scale * kernel_scale
+          follows, then the complex recombination. complex_Conv3D, dilated convolutions and complex_Conv2D with unequal
+          strides have no int8 kernel and quantize the weights only.
+Latency : the int8 products are exact, but on CPU they are slower than float. The TensorFlow quantized kernels are about 3.5x
+          slower than the float GEMM and convolution, XLA int8 dots about 7x. An int8 TFLite model was also slower than
+          float TensorFlow for these layer sizes. So the int8 inputs mode is for accuracy checks and int8 targets, and
+          weight-only is the default for CPU serving.
+Only for inference, the quantized layers are not trained.
+"""
+
+
+'layers with an int8 inference form'
+QUANTIZABLE_LAYERS = FOLDABLE_LAYERS
+
+
+def quantizable (layer):
+
+    'built, not yet quantized, not sparse, no activation, groups = 1 and channels_last'
+    return (type(layer) in QUANTIZABLE_LAYERS and layer.built and layer.activation is None and block_foldable(layer)
+            and not (layer.inference is not None and (layer.inference["quantized"] or layer.inference["sparse_entries"] is not None)))
+
+
+def quantize_layer (layer, input_scale = None):
+    '''
+    layer       : built complex_Dense, complex_Conv1D, complex_Conv2D or complex_Conv3D without activation
+    input_scale : None quantizes the weights only, a float int8 scale of the inputs (see input_scales) quantizes the inputs too,
+                  complex_Dense, complex_Conv1D and complex_Conv2D without dilation (equal complex_Conv2D strides)
+    returns a new layer running the int8 kernels of layer, see the module docstring
+    '''
+    if type(layer) not in QUANTIZABLE_LAYERS:
+        raise ValueError('Can not quantize ' + type(layer).__name__ + ', expected one of ' + str([quantizable.__name__ for quantizable in QUANTIZABLE_LAYERS]) + '.')
+    if layer.activation is not None:
+        raise ValueError('Can not quantize ' + layer.name + ', the activation runs inside the four real layers.')
+    if not block_foldable(layer):
+        raise ValueError('Can not quantize ' + layer.name + ', the block kernel needs groups = 1 and channels_last.')
+    if layer.inference is not None and layer.inference["quantized"]:
+        raise ValueError('Can not quantize ' + layer.name + ', it is already quantized.')
+    if layer.inference is not None and layer.inference["sparse_entries"] is not None:
+        raise ValueError('Can not quantize ' + layer.name + ', its kernel is sparse (float sparse values), quantize before sparsify_layer or without a sparse kernel.')
+    if input_scale is not None and not layer.quantized_inputs_supported():
+        raise ValueError('Can not quantize the inputs of ' + layer.name + ', there is no int8 kernel for ' + type(layer).__name__ + ' with these strides and dilation_rate, pass input_scale = None.')
+
+    'the dropped filters of a pruned layer stay dropped, the kept kernel is quantized'
+    drop_filters = layer.inference is not None and layer.inference["kept_filters"] is not None
+    return layer.inference_layer(*layer.inference_weights(), quantized = True, drop_filters = drop_filters, input_scale = input_scale)
+
+
+def input_scales (model, layers, representative_dataset):
+    '''
+    symmetric per tensor int8 scale of the inputs of every layer of layers, max(|xr|, |xi|) / 127
+    over the elements of representative_dataset (model inputs), on the float model
+    '''
+    nodes  = set(node for depth_nodes in model._nodes_by_depth.values() for node in depth_nodes)
+    inputs = [(layer, tensor) for layer in layers for node in layer.inbound_nodes if node in nodes for tensor in tf.nest.flatten(node.keras_inputs)]
+    probe  = tf.keras.Model(inputs = model.inputs, outputs = [tensor for _, tensor in inputs])
+
+    amax = dict((layer, 0.0) for layer in layers)
+    for element in dataset_elements(representative_dataset):
+        for (layer, _), outputs in zip(inputs, tf.nest.flatten(probe(element, training = False))):
+            parts = [tf.math.real(outputs), tf.math.imag(outputs)] if is_complex(outputs) else [outputs]
+            amax[layer] = max([amax[layer]] + [float(tf.reduce_max(tf.abs(tf.cast(part, tf.float32)))) for part in parts])
+
+    return dict((layer, max(value, np.finfo(np.float32).tiny) / INT8_MAX) for layer, value in amax.items())
+
+
+def quantize_model (model, representative_dataset = None):
+    '''
+    model                  : functional tf.keras.Model
+    representative_dataset : None quantizes the weights only, else an iterable of model inputs (or a callable returning one)
+                             that calibrates the int8 input scale of every layer with an int8 kernel (input_scales)
+    returns a new model where every built complex_Dense, complex_Conv1D, complex_Conv2D and complex_Conv3D
+    (no activation, groups = 1, channels_last, not a sparse kernel) is its quantized copy (quantize_layer).
+    With representative_dataset, complex_Conv3D, dilated convolutions and complex_Conv2D with unequal strides still quantize the weights only.
+    model is not changed, the new model shares its other layers and is only for inference.
+    '''
+    layers = [layer for layer in model.layers if quantizable(layer)]
+    scales = {}
+    if representative_dataset is not None:
+        scales = input_scales(model, [layer for layer in layers if layer.quantized_inputs_supported()], representative_dataset)
+
+    return rebuild_model(model, dict((layer, quantize_layer(layer, scales.get(layer))) for layer in layers))
+
+
+def weight_bytes (model):
+
+    'bytes of the weights of model'
+    return sum(int(np.prod(weight.shape)) * weight.dtype.size for weight in model.weights)
+
+
+def dataset_elements (dataset):
+
+    'an iterable of model inputs, or a callable returning one (like tf.lite.TFLiteConverter.representative_dataset)'
+    return dataset() if callable(dataset) else dataset
+
+
+def model_outputs (model, dataset):
+
+    'numpy outputs of model on every element of dataset, one list of flattened outputs per element'
+    return [[np.asarray(outputs) for outputs in tf.nest.flatten(model(inputs, training = False))] for inputs in dataset_elements(dataset)]
+
+
+def accuracy_report (model, dataset, reference_outputs, print_fn = print, line_length = 110):
+    '''
+    model             : the quantized model
+    reference_outputs : model_outputs of the float model on the same dataset
+    Prints a model.summary() like table and returns one dict per model output
+        name, shape, snr_db (10 log10 |reference|^2 / |error|^2), max_error, mean_error, relative_error (|error| / |reference|)
+    '''
+    outputs = model_outputs(model, dataset)
+    names   = getattr(model, "output_names", None) or ["output_" + str(index) for index in range(len(outputs[0]))]
+
+    rows = []
+    for index, name in enumerate(names):
+        reference = np.concatenate([np.ravel(batch[index]) for batch in reference_outputs])
+        error     = np.concatenate([np.ravel(batch[index]) for batch in outputs]) - reference
+        signal_power = np.sum(np.abs(reference) ** 2)
+        error_power  = np.sum(np.abs(error) ** 2)
+        rows.append({"name"           : name,
+                     "shape"          : outputs[0][index].shape,
+                     "snr_db"         : 10 * np.log10(signal_power / error_power) if error_power > 0 else np.inf,
+                     "max_error"      : float(np.max(np.abs(error))),
+                     "mean_error"     : float(np.mean(np.abs(error))),
+                     "relative_error" : float(np.sqrt(error_power / signal_power)) if signal_power > 0 else np.inf})
+
+    if print_fn is None:
+        return rows
+
+    columns = [0.28, 0.18, 0.12, 0.14, 0.14, 0.14]
+    positions = np.cumsum([int(line_length * column) for column in columns])
+
+    def print_row (fields):
+        line = ""
+        for field, position in zip(fields, positions):
+            line = (line + str(field))[:position - 1]
+            line = line + " " * (position - len(line))
+        print_fn(line)
+
+    print_fn("_" * line_length)
+    print_row(["Output", "Shape", "SNR dB", "Max error", "Mean error", "Relative error"])
+    print_fn("=" * line_length)
+    for row in rows:
+        print_row([row["name"], row["shape"], "%.2f" % row["snr_db"], "%.3e" % row["max_error"], "%.3e" % row["mean_error"], "%.3e" % row["relative_error"]])
+        print_fn("_" * line_length)
+
+    return rows
+
+
+if __name__ == "__main__":
+    '''
+    quantize_model Test,
+    quantized outputs must be same as float outputs of the dequantized int8 kernels up to float rounding,
+    close to the float model (SNR), with 4x smaller kernels and about the float latency,
+    int8 inputs (representative_dataset) : lower SNR, slower than float on CPU, see the module docstring
+    '''
+    import time
+
+    def latency (function, inputs, iterations = 20):
+        function(inputs)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            function(inputs)
+        return 1e+3 * (time.perf_counter() - start) / iterations
+
+    real_inputs = tf.keras.Input(shape = (32, 32, 16))
+    imag_inputs = tf.keras.Input(shape = (32, 32, 16))
+    real, imag = complex_Conv2D(filters = 32, strides = (1, 1), bias_initializer = 'glorot_uniform')(real_inputs, imag_inputs)
+    real, imag = CReLU(real, imag)
+    real, imag = complex_Conv1D(filters = 32, kernel_size = 3, padding = "causal", dilation_rate = 2)(tf.reshape(real, [-1, 32 * 32, 32]), tf.reshape(imag, [-1, 32 * 32, 32]))
+    real, imag = complex_Dense(units = 256, fused = True)(tf.reshape(real, [-1, 32 * 32]), tf.reshape(imag, [-1, 32 * 32]))
+    model = tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+
+    validation_dataset = [[tf.random.normal([4, 32, 32, 16]), tf.random.normal([4, 32, 32, 16])] for _ in range(4)]
+    quantized = quantize_model(model)
+    print("quantized :", [layer.name for layer in quantized.layers if getattr(layer, "inference", None)])
+
+    'dequantized int8 kernels reference of the first layer'
+    layer  = model.layers[2]
+    inputs = validation_dataset[0]
+    real_kernel, imag_kernel, bias = layer.complex_weights()
+    scale = tf.reduce_max(tf.abs(tf.stack([real_kernel, imag_kernel])), axis = [0, 1, 2, 3]) / INT8_MAX
+    fake  = [tf.cast(quantize_int8(kernel, scale), tf.float32) * scale for kernel in [real_kernel, imag_kernel]]
+    fake_kernel  = tf.concat([tf.concat([fake[0], fake[1]], axis = -1), tf.concat([-fake[1], fake[0]], axis = -1)], axis = -2)
+    fake_outputs = tf.split(layer.convolution(tf.concat(inputs, axis = -1), fake_kernel) + bias, 2, axis = -1)
+    for fake, quantized_outputs in zip(fake_outputs, quantized.layers[2](*inputs)):
+        print("dequantized kernels", quantized_outputs.shape, np.allclose(fake, quantized_outputs, atol = 1e-4))
+
+    reference = model_outputs(model, validation_dataset)
+    rows = accuracy_report(quantized, validation_dataset, reference)
+    print("SNR > 30 dB :", all(row["snr_db"] > 30 for row in rows))
+    print("weights : float %d bytes, quantized %d bytes" % (weight_bytes(model), weight_bytes(quantized)))
+
+    'the dilated complex_Conv1D has no int8 kernel and keeps float inputs'
+    calibration_dataset = [[tf.random.normal([4, 32, 32, 16]), tf.random.normal([4, 32, 32, 16])] for _ in range(4)]
+    int8_inputs = quantize_model(model, representative_dataset = calibration_dataset)
+    print("int8 inputs :", [layer.name for layer in int8_inputs.layers if getattr(layer, "inference", None) and layer.inference["quantized_inputs"]])
+    accuracy_report(int8_inputs, validation_dataset, reference)
+    print("latency : float %.2f ms, quantized %.2f ms, int8 inputs %.2f ms" % (latency(tf.function(model), inputs), latency(tf.function(quantized), inputs),
+                                                                           latency(tf.function(int8_inputs), inputs)))
@@ -0,0 +1,279 @@
+import numpy as np
+import tensorflow as tf
+import tensorflow.keras.backend as K
+from tensorflow.keras import initializers
+
+from complex_layers.utils import *
+"""
+Complex recurrent layers on (real, imag) sequences [batch_size, time_step, features], e.g. STFT_network outputs.
+
+Gate pre-activations are complex linear maps  W x + U h + b  (W = Wr + i Wi, U = Ur + i Ui).
+The activations are split-type (sigmoid / tanh on the real and on the imaginary part, like CReLU),
+so each part of the state is gated by the same part of its gate and the state stays bounded.
+
+Fused execution
+    the input projection of every gate and every time step is one GEMM of [xr, xi] with the block kernel
+        [[ Wr, Wi],
+         [-Wi, Wr]]      (columns gate-major, [real units, imag units] per gate)
+    each time step is then one [hr, hi] GEMM with the recurrent block kernel, for all gates at once,
+    instead of four real matmuls per gate.
+
+Streaming
+    stateful = True keeps the last state in variables between calls (reset_states() before a new stream),
+    step(real_frame, imag_frame) runs one frame [batch_size, features], O(1) per frame.
+
+call returns (real, imag) sequences (return_sequences = True) or last outputs,
+with return_state = True also the state, a list of (real, imag) pairs, [h, c] for complex_LSTM and [h] for complex_GRU.
+initial_state has the same format.
+"""
+
+
+def complex_block_kernel (real_kernel, imag_kernel, gates):
+    '''
+    real_kernel, imag_kernel : [in, gates * units]
+    returns [2 * in, gates * 2 * units], [xr, xi] @ kernel = gate-major [real, imag] of x @ (Wr + i Wi)
+    '''
+    rows = real_kernel.shape[0]
+    real_outputs = tf.reshape(tf.concat([real_kernel, -imag_kernel], axis = 0), [2 * rows, gates, -1])
+    imag_outputs = tf.reshape(tf.concat([imag_kernel,  real_kernel], axis = 0), [2 * rows, gates, -1])
+
+    return tf.reshape(tf.stack([real_outputs, imag_outputs], axis = 2), [2 * rows, -1])
+
+
+def complex_block_bias (real_bias, imag_bias, gates):
+
+    'real_bias, imag_bias : [gates * units] -> [gates * 2 * units] in the column order of complex_block_kernel'
+    return tf.reshape(tf.stack([tf.reshape(real_bias, [gates, -1]), tf.reshape(imag_bias, [gates, -1])], axis = 1), [-1])
+
+
+class complex_RNN (tf.keras.layers.Layer):
+    '''
+    Base of complex_LSTM and complex_GRU.
+    Subclasses set gates, state_number and cell (projection_t, states, recurrent_kernel) -> (outputs_t, states),
+    every tensor of the loop holds [real units, imag units] concatenated on the last axis.
+    '''
+    gates        = None
+    state_number = None
+
+    def __init__ (self, units,
+                        return_sequences = False,
+                        return_state     = False,
+                        stateful         = False,
+                        kernel_initializer    = 'glorot_uniform',
+                        recurrent_initializer = 'orthogonal',
+                        bias_initializer      = 'zeros',
+                        **kwargs):
+
+        super(complex_RNN, self).__init__(**kwargs)
+
+        self.units            = units
+        self.return_sequences = return_sequences
+        self.return_state     = return_state
+        self.stateful         = stateful
+        self.kernel_initializer    = initializers.get(kernel_initializer)
+        self.recurrent_initializer = initializers.get(recurrent_initializer)
+        self.bias_initializer      = initializers.get(bias_initializer)
+
+
+    def new_initializer (self, initializer):
+
+        'one instance per weight, an unseeded Keras initializer instance returns the same values on every call'
+        return initializers.get(initializers.serialize(initializer))
+
+
+    def real_bias_initializer (self):
+
+        return self.new_initializer(self.bias_initializer)
+
+
+    def build (self, inputs_shape):
+
+        features = inputs_shape[-1]
+        columns  = self.gates * self.units
+
+        self.real_kernel = self.add_weight(name = 'real_kernel', shape = (features, columns), initializer = self.new_initializer(self.kernel_initializer))
+        self.imag_kernel = self.add_weight(name = 'imag_kernel', shape = (features, columns), initializer = self.new_initializer(self.kernel_initializer))
+        self.real_recurrent_kernel = self.add_weight(name = 'real_recurrent_kernel', shape = (self.units, columns), initializer = self.new_initializer(self.recurrent_initializer))
+        self.imag_recurrent_kernel = self.add_weight(name = 'imag_recurrent_kernel', shape = (self.units, columns), initializer = self.new_initializer(self.recurrent_initializer))
+        self.real_bias = self.add_weight(name = 'real_bias', shape = (columns,), initializer = self.real_bias_initializer())
+        self.imag_bias = self.add_weight(name = 'imag_bias', shape = (columns,), initializer = self.new_initializer(self.bias_initializer))
+
+        if self.stateful:
+            'non-trainable weights of the layer, the batch dimension stays None so that reset_states can change the batch size'
+            batch_size = inputs_shape[0] if inputs_shape[0] is not None else 1
+            zeros = lambda shape, dtype = None : tf.zeros([batch_size, 2 * self.units], dtype = dtype)
+            self.state_variables = [self.add_weight(name = 'state_' + str(index), shape = (None, 2 * self.units), initializer = zeros,
+                                                    trainable = False, experimental_autocast = False) for index in range(self.state_number)]
+
+        super(complex_RNN, self).build(inputs_shape)
+
+
+    def reset_states (self, batch_size = None):
+
+        if batch_size is None:
+            batch_size = tf.shape(self.state_variables[0])[0]
+
+        for variable in self.state_variables:
+            variable.assign(tf.zeros([batch_size, 2 * self.units]))
+
+
+    def initial_states (self, inputs, initial_state):
+
+        if initial_state is not None:
+            return [tf.cast(tf.concat(pair, axis = -1), inputs.dtype) for pair in initial_state]
+        if self.stateful:
+            return [tf.cast(variable, inputs.dtype) for variable in self.state_variables]
+
+        return [tf.zeros([tf.shape(inputs)[0], 2 * self.units], dtype = inputs.dtype) for _ in range(self.state_number)]
+
+
+    def call (self, real_inputs, imag_inputs = None, initial_state = None):
+
+        if imag_inputs is None:
+            'complex64 sequence, the outputs and states are merged back to complex64'
+            if initial_state is not None:
+                initial_state = [split_complex(state) for state in initial_state]
+            outputs = self.call(*split_complex(real_inputs), initial_state = initial_state)
+            if not self.return_state:
+                return merge_complex(*outputs)
+            return merge_complex(*outputs[:2]), [merge_complex(*pair) for pair in outputs[2]]
+
+        real_inputs, imag_inputs = cast_pair(real_inputs, imag_inputs, self.compute_dtype)
+
+        'input projection of every gate and time step, one GEMM'
+        inputs     = tf.concat([real_inputs, imag_inputs], axis = -1)
+        kernel     = complex_block_kernel(self.real_kernel, self.imag_kernel, self.gates)
+        projection = tf.nn.bias_add(tf.tensordot(inputs, kernel, axes = [[-1], [0]]), complex_block_bias(self.real_bias, self.imag_bias, self.gates))
+        projection = tf.ensure_shape(projection, inputs.shape[:-1] + [2 * self.gates * self.units])
+
+        recurrent_kernel = complex_block_kernel(self.real_recurrent_kernel, self.imag_recurrent_kernel, self.gates)
+        states = self.initial_states(inputs, initial_state)
+
+        last_outputs, outputs, states = K.rnn(lambda projection_t, states: self.cell(projection_t, states, recurrent_kernel), projection, states)
+
+        if self.stateful:
+            for variable, state in zip(self.state_variables, states):
+                variable.assign(tf.cast(state, variable.dtype))
+
+        outputs = outputs if self.return_sequences else last_outputs
+        real_outputs, imag_outputs = tf.split(outputs, 2, axis = -1)
+
+        if not self.return_state:
+            return real_outputs, imag_outputs
+        return real_outputs, imag_outputs, [tuple(tf.split(state, 2, axis = -1)) for state in states]
+
+
+    def step (self, real_inputs, imag_inputs = None):
+        '''
+        One frame [batch_size, features] of a stateful layer, returns the [batch_size, units] outputs
+        (and the state when return_state = True)
+        '''
+        if not self.stateful:
+            raise ValueError(type(self).__name__ + '.step needs stateful = True.')
+
+        if imag_inputs is None:
+            outputs = self(tf.expand_dims(real_inputs, axis = 1))
+        else:
+            outputs = self(tf.expand_dims(real_inputs, axis = 1), tf.expand_dims(imag_inputs, axis = 1))
+
+        if not self.return_sequences:
+            return outputs
+        if self.return_state:
+            return tuple(output[:, 0] for output in outputs[:-1]) + (outputs[-1],)
+        if imag_inputs is None:
+            return outputs[:, 0]
+        return tuple(output[:, 0] for output in outputs)
+
+
+    def get_config (self):
+        config = {'units': self.units,
+            'return_sequences': self.return_sequences,
+            'return_state': self.return_state,
+            'stateful': self.stateful,
+            'kernel_initializer':    initializers.serialize(self.kernel_initializer),
+            'recurrent_initializer': initializers.serialize(self.recurrent_initializer),
+            'bias_initializer':      initializers.serialize(self.bias_initializer)}
+        base_config = super(complex_RNN, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
+
+'COMPLEX LSTM'
+class complex_LSTM (complex_RNN):
+    '''
+    gates i, f, g, o
+        c = sigmoid(f) * c + sigmoid(i) * tanh(g)
+        h = sigmoid(o) * tanh(c)
+    unit_forget_bias = True : the real part of the forget gate bias starts at 1, like tf.keras.layers.LSTM
+    '''
+    gates        = 4
+    state_number = 2
+
+    def __init__ (self, units, unit_forget_bias = True, **kwargs):
+
+        super(complex_LSTM, self).__init__(units, **kwargs)
+        self.unit_forget_bias = unit_forget_bias
+
+
+    def real_bias_initializer (self):
+
+        if not self.unit_forget_bias:
+            return self.new_initializer(self.bias_initializer)
+
+        def initializer (shape, dtype = None, **kwargs):
+            return tf.concat([self.new_initializer(self.bias_initializer)((self.units,), dtype = dtype),
+                              tf.ones((self.units,), dtype = dtype),
+                              self.new_initializer(self.bias_initializer)((2 * self.units,), dtype = dtype)], axis = 0)
+        return initializer
+
+
+    def cell (self, projection, states, recurrent_kernel):
+
+        hidden, cell = states
+        input_gate, forget_gate, candidate, output_gate = tf.split(projection + tf.matmul(hidden, recurrent_kernel), 4, axis = -1)
+
+        cell   = tf.sigmoid(forget_gate) * cell + tf.sigmoid(input_gate) * tf.tanh(candidate)
+        hidden = tf.sigmoid(output_gate) * tf.tanh(cell)
+
+        return hidden, [hidden, cell]
+
+
+    def get_config (self):
+        config = {'unit_forget_bias': self.unit_forget_bias}
+        base_config = super(complex_LSTM, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
+
+'COMPLEX GRU'
+class complex_GRU (complex_RNN):
+    '''
+    gates z, r, n (reset_after, like tf.keras.layers.GRU)
+        n = tanh(x_n + sigmoid(r) * (U_n h + b_n))
+        h = sigmoid(z) * h + (1 - sigmoid(z)) * n
+    the recurrent bias b_n is a separate complex bias, z and r only use the input bias
+    '''
+    gates        = 3
+    state_number = 1
+
+    def build (self, inputs_shape):
+
+        self.real_recurrent_bias = self.add_weight(name = 'real_recurrent_bias', shape = (self.units,), initializer = self.new_initializer(self.bias_initializer))
+        self.imag_recurrent_bias = self.add_weight(name = 'imag_recurrent_bias', shape = (self.units,), initializer = self.new_initializer(self.bias_initializer))
+
+        super(complex_GRU, self).build(inputs_shape)
+
+
+    def cell (self, projection, states, recurrent_kernel):
+
+        hidden, = states
+        recurrent = tf.matmul(hidden, recurrent_kernel)
+
+        update_input, reset_input, candidate_input = tf.split(projection, 3, axis = -1)
+        update_hidden, reset_hidden, candidate_hidden = tf.split(recurrent, 3, axis = -1)
+        candidate_hidden = candidate_hidden + tf.cast(tf.concat([self.real_recurrent_bias, self.imag_recurrent_bias], axis = 0), hidden.dtype)
+
+        update    = tf.sigmoid(update_input + update_hidden)
+        candidate = tf.tanh(candidate_input + tf.sigmoid(reset_input + reset_hidden) * candidate_hidden)
+        hidden    = update * hidden + (1 - update) * candidate
+
+        return hidden, [hidden]
+
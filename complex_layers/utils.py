@@ -0,0 +1,123 @@
+import tensorflow as tf
+
+
+'mixed precision compute dtypes, there is no half precision complex dtype'
+HALF_DTYPES = [tf.float16, tf.bfloat16]
+
+
+def is_complex (inputs):
+
+    return tf.as_dtype(inputs.dtype).is_complex
+
+
+def split_complex (inputs):
+    
+    'complex64 tensor -> (real, imag) float32 tensors'
+    return tf.math.real(inputs), tf.math.imag(inputs)
+
+
+def merge_complex (real, imag):
+
+    '(real, imag) float32 tensors -> complex64 tensor, half precision parts are merged in float32'
+    'convert_to_tensor reads autocast variables in the compute dtype'
+    real, imag = tf.convert_to_tensor(real), tf.convert_to_tensor(imag)
+    if real.dtype != imag.dtype or real.dtype in HALF_DTYPES:
+        real, imag = tf.cast(real, tf.float32), tf.cast(imag, tf.float32)
+
+    return tf.complex(real, imag)
+
+
+def call_on_complex (call, inputs, *args, **kwargs):
+    '''
+    Run a (real, imag) -> (real, imag) function on a single complex tensor,
+    returns a single complex tensor.
+    This is an adapter, not a fast path : split_complex and merge_complex allocate the two parts
+    and the merged outputs, so a complex64 layer costs two more copies than the (real, imag) API.
+    Only the layers without a complex64 kernel go through it, tf.nn.conv* and the pooling run on real tensors.
+    complex_Dense, the batch norms, zReLU / modReLU / complex_softmax and the fft STFT engines run complex64 natively.
+    '''
+    real, imag = split_complex(inputs)
+    real, imag = call(real, imag, *args, **kwargs)
+
+    return merge_complex(real, imag)
+
+
+def upcast (inputs):
+
+    'half precision (float16, bfloat16) -> float32, used where the statistics must accumulate in float32'
+    if inputs is not None and tf.convert_to_tensor(inputs).dtype in HALF_DTYPES:
+        return tf.cast(inputs, tf.float32)
+
+    return inputs
+
+
+def normalize_tuple (value, rank):
+
+    'an int or a sequence -> a tuple of rank ints, like the kernel_size / strides arguments of tf.keras.layers.Conv*'
+    return tuple(value) if isinstance(value, (tuple, list)) else (value,) * rank
+
+
+def cast_pair (real, imag, dtype):
+    '''
+    Casts (real, imag) to the layer compute dtype (mixed precision policy).
+    Keras autocasts only the first call argument, imag and the parts split from a complex64 tensor are cast here.
+    '''
+    return tf.cast(real, dtype), tf.cast(imag, dtype)
+
+
+'symmetric int8 range, -128 is not used so that the range is symmetric around 0'
+INT8_MAX = 127
+
+
+def quantize_int8 (inputs, scale):
+
+    'float -> int8, round(inputs / scale) clipped to [-127, 127]'
+    inputs = tf.round(tf.cast(inputs, tf.float32) / scale)
+    return tf.cast(tf.clip_by_value(inputs, -INT8_MAX, INT8_MAX), tf.int8)
+
+
+'''
+int8 x int8 -> int32 products with the TensorFlow quantized CPU kernels (gemmlowp), which take quint8 operands.
+The int8 value q is the quint8 value q + 128 (the sign bit flipped) of the range [-128, 127],
+the op subtracts the zero point 128 of both operands, so the int32 outputs are the exact products of the int8 values.
+'''
+QUINT8_RANGE = dict(min = -128.0, max = 127.0)
+
+
+def offset_quint8 (inputs):
+
+    'int8 q -> quint8 q + 128'
+    return tf.bitcast(tf.bitwise.bitwise_xor(tf.bitcast(inputs, tf.uint8), tf.constant(128, tf.uint8)), tf.quint8)
+
+
+def quantized_matmul (inputs, kernel):
+
+    'int8 [rows, in] x int8 [in, columns] -> int32 [rows, columns]'
+    outputs, _, _ = tf.raw_ops.QuantizedMatMul(a = offset_quint8(inputs), b = offset_quint8(kernel),
+                                               min_a = QUINT8_RANGE["min"], max_a = QUINT8_RANGE["max"],
+                                               min_b = QUINT8_RANGE["min"], max_b = QUINT8_RANGE["max"], Toutput = tf.qint32)
+    return tf.bitcast(outputs, tf.int32)
+
+
+def quantized_conv2d (inputs, kernel, strides, padding):
+
+    'int8 NHWC inputs, int8 [kh, kw, in, filters] kernel -> int32, strides (h, w), no dilation'
+    outputs, _, _ = tf.raw_ops.QuantizedConv2D(input = offset_quint8(inputs), filter = offset_quint8(kernel),
+                                               min_input = QUINT8_RANGE["min"], max_input = QUINT8_RANGE["max"],
+                                               min_filter = QUINT8_RANGE["min"], max_filter = QUINT8_RANGE["max"],
+                                               strides = (1,) + tuple(strides) + (1,), padding = padding.upper(), out_type = tf.qint32)
+    return tf.bitcast(outputs, tf.int32)
+
+
+def expand_filters (outputs, index, bias):
+    '''
+    outputs : [..., 2 * kept] outputs of the kept filters of a pruned layer, see complex_layers.pruning
+    index   : [2 * filters] position of every output channel in outputs, 2 * kept for a pruned filter, None when none is pruned
+    returns [..., 2 * filters] outputs + bias, a pruned filter outputs its bias
+    The outputs are placed by a one-hot [2 * kept, 2 * filters] GEMM, a gather on the channel axis is several times slower on CPU.
+    '''
+    if index is not None:
+        selection = tf.one_hot(index, outputs.shape[-1] + 1, axis = 0, dtype = outputs.dtype)[:-1]
+        outputs   = tf.tensordot(outputs, selection, axes = [[-1], [0]])
+
+    return tf.nn.bias_add(outputs, bias)
@@ -6,6 +6,9 @@ import numpy as np
 import tensorflow as tf
 import tensorflow.keras.backend as K
 from tensorflow.keras.layers import *
+
+from complex_layers.utils import *
+from spectral_layers import basis_cache
 """
 STFT_network's INPUT : [batch_size, time_step (signal length), channel == 1]
 STFT_network's OUTPUT : return real, imag
@@ -16,6 +19,7 @@ print(sound.shape)
 
 real : [batch_size, time_step, frequency_bin]
 imag : [batch_size, time_step, frequency_bin]
+With channel > 1 every channel is transformed on its own (every engine) : [batch_size, time_step, frequency_bin, channel]
     
     STFT Network's outputs is transformation of time_step, frequency_bin transpose
     So,
@@ -38,14 +42,26 @@ imag : [batch_size, time_step, frequency_bin]
     length = 1024, over_lapping = 256, padding = "same"
     And the layer's trainable option is based on "False".
     Do not learn. DFT kernel is broken
+
+4. Complex tensor
+    STFT_network(return_complex = True) returns one complex64 spectrogram [batch_size, time_step, frequency_bin]
+    ISTFT_network accepts it directly, ISTFT_network()(spec)
 """
 
 
 'Short Time Fourier Transform via Neural Network'
 class STFT_network (tf.keras.layers.Layer):
+    '''
+    engine = "conv"       : two Conv1D with a [window_length, 1, frequency_bin] windowed DFT kernel, O(N^2) per frame
+    engine = "fused_conv" : one Conv1D with the cosine and sine kernels stacked, [window_length, 1, 2 * frequency_bin]
+                            reads the signal once, output is split into real and imag
+    engine = "fft"        : tf.signal.frame + tf.signal.rfft on the windowed frames, O(N log N) per frame
+                            same output (same padding, same hop) and no DFT kernel constants
+    The fft engine computes one complex64 spectrogram, return_complex = False splits it into (real, imag).
+    The conv engines compute (real, imag) with real convolutions, return_complex = True merges them.
+    '''
     
-
-    def __init__ (self, window_length = 1024, over_lapping = 256, padding = "same"):
+    def __init__ (self, window_length = 1024, over_lapping = 256, padding = "same", return_complex = False, engine = "conv"):
         
         super(STFT_network, self).__init__()
         
@@ -53,23 +69,21 @@ class STFT_network (tf.keras.layers.Layer):
         self.frequency_bin = int(self.window_length/2 + 1)
         self.over_lapping  = over_lapping
         self.padding = padding
+        self.return_complex = return_complex
+        self.engine  = engine
+
+        if self.engine not in ["conv", "fused_conv", "fft"]:
+            raise ValueError('engine must be "conv", "fused_conv" or "fft", but got ' + str(self.engine))
         
-        self.fourier_basis = np.fft.fft(np.eye(self.window_length))
-        self.discrete_fourier_transform_window = scipy.signal.hann(self.window_length, sym = False)
+        'Hann window and DFT kernel are shared by every instance, see spectral_layers/basis_cache.py'
+        self.discrete_fourier_transform_window = basis_cache.analysis_window(self.window_length, "hann")
         self.discrete_fourier_transform_window = self.discrete_fourier_transform_window.reshape((1, -1))
-        
-        self.kernel = np.multiply(self.fourier_basis, self.discrete_fourier_transform_window)
-        del (self.fourier_basis)
-        
-        self.kernel = self.kernel[:self.frequency_bin, :]
-        
-        self.real_kernel_init = np.real(self.kernel)
-        self.imag_kernel_init = np.imag(self.kernel)
 
-        self.real_kernel_init = self.real_kernel_init.T
-        self.imag_kernel_init = self.imag_kernel_init.T
-        self.real_kernel_init = self.real_kernel_init[:, None, :]
-        self.imag_kernel_init = self.imag_kernel_init[:, None, :]
+        'The fft engine never needs the DFT kernel'
+        if self.engine == "conv":
+            self.real_kernel_init, self.imag_kernel_init = basis_cache.stft_kernel(self.window_length, "hann", self.dtype)
+        elif self.engine == "fused_conv":
+            self.kernel_init = basis_cache.stft_fused_kernel(self.window_length, "hann", self.dtype)
         
         
     def build (self, inputs_shape):
@@ -79,19 +93,28 @@ class STFT_network (tf.keras.layers.Layer):
         self.strides : same as over_lapping number
         kernel_initializer : 3D Tensor [width = window_length, height = 1, output size : self.frequency_bin]
         '''  
-        self.real_fourier_convolution = Conv1D(filters = self.frequency_bin, 
-                                                kernel_size = self.window_length, 
-                                                strides = self.over_lapping, 
-                                                padding = self.padding,
-                                                kernel_initializer = tf.keras.initializers.Constant(value = self.real_kernel_init),
-                                                trainable = False)
-        
-        self.imag_foruier_convolution = Conv1D(filters = self.frequency_bin, 
-                                                kernel_size = self.window_length, 
-                                                strides = self.over_lapping, 
-                                                padding = self.padding,
-                                                kernel_initializer = tf.keras.initializers.Constant(value = self.imag_kernel_init),
-                                                trainable = False)
+        if self.engine == "conv":
+            self.real_fourier_convolution = Conv1D(filters = self.frequency_bin, 
+                                                    kernel_size = self.window_length, 
+                                                    strides = self.over_lapping, 
+                                                    padding = self.padding,
+                                                    kernel_initializer = tf.keras.initializers.Constant(value = self.real_kernel_init),
+                                                    trainable = False)
+            
+            self.imag_foruier_convolution = Conv1D(filters = self.frequency_bin, 
+                                                    kernel_size = self.window_length, 
+                                                    strides = self.over_lapping, 
+                                                    padding = self.padding,
+                                                    kernel_initializer = tf.keras.initializers.Constant(value = self.imag_kernel_init),
+                                                    trainable = False)
+
+        elif self.engine == "fused_conv":
+            self.fourier_convolution = Conv1D(filters = 2 * self.frequency_bin, 
+                                            kernel_size = self.window_length, 
+                                            strides = self.over_lapping, 
+                                            padding = self.padding,
+                                            kernel_initializer = tf.keras.initializers.Constant(value = self.kernel_init),
+                                            trainable = False)
         
         super(STFT_network, self).build(inputs_shape)
         
@@ -99,17 +122,79 @@ class STFT_network (tf.keras.layers.Layer):
     def call (self, input_signal):
 
         'inputs_signal : 3D Tensor [batch_size, signal_length, channel_number]'
-        real = self.real_fourier_convolution(input_signal)
-        imag = self.imag_foruier_convolution(input_signal)
+        if input_signal.shape[-1] not in [None, 1]:
+            return self.multi_channel_call(input_signal)
+
+        if self.engine == "fft":
+            spectrogram = self.fft_call(input_signal)
+            if self.return_complex:
+                return spectrogram
+            return cast_pair(*split_complex(spectrogram), self.compute_dtype)
+
+        if self.engine == "fused_conv":
+            real, imag = tf.split(self.fourier_convolution(input_signal), 2, axis = -1)
+        else:
+            real = self.real_fourier_convolution(input_signal)
+            imag = self.imag_foruier_convolution(input_signal)
+
+        if self.return_complex:
+            return merge_complex(real, imag)
         
         return real, imag
 
 
+    def multi_channel_call (self, input_signal):
+
+        'channels are folded into the batch, [batch_size * channel, signal_length, 1], then unfolded : [batch_size, time_step, frequency_bin, channel]'
+        batch_size = tf.shape(input_signal)[0]
+        channel    = input_signal.shape[-1]
+        signal     = tf.reshape(tf.transpose(input_signal, perm = [0, 2, 1]), [-1, tf.shape(input_signal)[1], 1])
+
+        def unfold (outputs):
+            outputs = tf.reshape(outputs, [batch_size, channel, tf.shape(outputs)[1], self.frequency_bin])
+            return tf.transpose(outputs, perm = [0, 2, 3, 1])
+
+        if self.return_complex:
+            return unfold(self.call(signal))
+        return tuple(unfold(outputs) for outputs in self.call(signal))
+
+
+    def fft_call (self, input_signal):
+        '''
+        Pads like Conv1D(padding = "same" or "valid"), frames with hop = over_lapping,
+        then rfft of every windowed frame : [batch_size, time_step, frequency_bin] complex64
+        rfft has no half precision kernel, float16 / bfloat16 signals are framed then transformed in float32
+        '''
+        'one channel, multi_channel_call folds the other channels into the batch'
+        signal = input_signal[:, :, 0]
+
+        if self.padding == "same":
+            'Conv1D "same" : ceil(length / hop) frames, the extra half is on the right'
+            signal_length = tf.shape(signal)[1]
+            frame_number  = -(-signal_length // self.over_lapping)
+            pad_total = tf.maximum((frame_number - 1) * self.over_lapping + self.window_length - signal_length, 0)
+            pad_left  = pad_total // 2
+            signal = tf.pad(signal, [[0, 0], [pad_left, pad_total - pad_left]])
+
+        frames = upcast(tf.signal.frame(signal, frame_length = self.window_length, frame_step = self.over_lapping))
+        window = tf.constant(self.discrete_fourier_transform_window[0], dtype = frames.dtype)
+
+        return tf.signal.rfft(frames * window, fft_length = [self.window_length])
+
+
 'Inverse Short Time Fourier Transform via Neural Network'    
 class ISTFT_network (tf.keras.layers.Layer):
-    
+    '''
+    engine = "conv" : Conv2DTranspose with a [window_length, 1, 1, 2 * frequency_bin] pinv(DFT) kernel
+    engine = "fft"  : tf.signal.irfft of every frame, inverse_stft_window, tf.signal.overlap_and_add
+                      same output length and cropping as the Conv2DTranspose (padding = "same" or "valid")
+                      For spectrograms of real signals (e.g. STFT_network outputs) both engines are equal,
+                      irfft ignores the imaginary part of the DC and Nyquist bins where pinv least-squares them.
+    The fft engine transforms one complex64 spectrogram, (real, imag) inputs are merged into it.
+    The conv engine transforms (real, imag) with a real convolution, a complex64 input is split.
+    '''
 
-    def __init__ (self, window_length = 1024, over_lapping = 256, padding = "same"):
+    def __init__ (self, window_length = 1024, over_lapping = 256, padding = "same", engine = "conv"):
         
         super(ISTFT_network, self).__init__()
         
@@ -120,46 +205,42 @@ class ISTFT_network (tf.keras.layers.Layer):
         self.kernel_size = window_length
         self.strides     = over_lapping
         self.padding     = padding
-        
-        self.window_coefficient = scipy.signal.get_window("hanning", self.window_length)
-        self.inverse_window     = self.inverse_stft_window(self.window_coefficient, self.over_lapping)
+        self.engine      = engine
 
-        'Inverse Fourier Transform Kernel'
-        self.fourier_basis = np.fft.fft(np.eye(self.window_length))
-        self.fourier_basis = np.vstack([np.real(self.fourier_basis[:self.cut_off, :]), np.imag(self.fourier_basis[:self.cut_off, :])])
+        if self.engine not in ["conv", "fft"]:
+            raise ValueError('engine must be "conv" or "fft", but got ' + str(self.engine))
+        
+        'Hann window, inverse window and Inverse Fourier Transform Kernel are shared by every instance, see spectral_layers/basis_cache.py'
+        self.window_coefficient = basis_cache.analysis_window(self.window_length, "hann")
 
-        self.inverse_basis = self.inverse_window * np.linalg.pinv(self.fourier_basis).T[ :, None, None, ]
-        self.inverse_basis = self.inverse_basis.T
+        'the fft engine never needs the pinv kernel'
+        if self.engine == "conv":
+            self.inverse_window, self.inverse_basis = basis_cache.istft_kernel(self.window_length, self.over_lapping, "hann", self.dtype)
+        else:
+            self.inverse_window = basis_cache.istft_window(self.window_length, self.over_lapping, "hann", self.dtype)
 
         
     def inverse_stft_window (self, window, hop_length):
 
-            'Ceiling Division'
-            window_length = len(window)
-            denom = window ** 2
-            overlaps = -(-window_length // hop_length) 
-            denom = np.pad(denom, (0, overlaps * hop_length - window_length), 'constant')
-            denom = np.reshape(denom, (overlaps, hop_length)).sum(0)
-            denom = np.tile(denom, (overlaps, 1)).reshape(overlaps * hop_length)
-
-            return window / denom[:window_length]
+            return basis_cache.inverse_stft_window(window, hop_length)
         
         
     def build (self, inputs_shape):
         
-        self.expand_dims_lambda = Lambda(lambda x: K.expand_dims(x, axis = 2))
-        self.Conv2DTranspose    = Conv2DTranspose(filters = 1, 
-                                                kernel_size = (self.kernel_size, 1), 
-                                                strides = (self.strides, 1), 
-                                                padding = self.padding,
-                                                kernel_initializer = tf.keras.initializers.Constant(self.inverse_basis),
-                                                trainable = False)
-        self.squeeze_dims_lambda = Lambda(lambda x: K.squeeze(x, axis = 2))
+        if self.engine == "conv":
+            self.expand_dims_lambda = Lambda(lambda x: K.expand_dims(x, axis = 2))
+            self.Conv2DTranspose    = Conv2DTranspose(filters = 1, 
+                                                    kernel_size = (self.kernel_size, 1), 
+                                                    strides = (self.strides, 1), 
+                                                    padding = self.padding,
+                                                    kernel_initializer = tf.keras.initializers.Constant(self.inverse_basis),
+                                                    trainable = False)
+            self.squeeze_dims_lambda = Lambda(lambda x: K.squeeze(x, axis = 2))
         
         super(ISTFT_network, self).build(inputs_shape)
         
         
-    def call (self, real, imag):
+    def call (self, real, imag = None):
         '''
         inputs_signal : 3D Tensor [batch_size, time_step (signal length), channel_number (Frequency bin)]
         To do Inverse Short Time Fourier Transform...
@@ -175,10 +256,232 @@ class ISTFT_network (tf.keras.layers.Layer):
         [batch size, signal length, 1, 1] It's a form.
 
         Reduce size with skew to form [batch size, signal length, 1].
+
+        If imag is None, real is one complex64 spectrogram.
         '''
+        if self.engine == "fft":
+            spectrogram = real if imag is None else merge_complex(real, imag)
+            return self.fft_call(spectrogram)
+
+        if imag is None:
+            real, imag = split_complex(real)
+
+        real, imag = cast_pair(real, imag, self.compute_dtype)
         input_tensor = tf.concat([real, imag], axis = 2)
         outputs = self.expand_dims_lambda(input_tensor)
         outputs = self.Conv2DTranspose(outputs)
         outputs = self.squeeze_dims_lambda(outputs)
         
-        return outputs
\ No newline at end of file
+        return outputs
+
+
+    def fft_call (self, spectrogram):
+        '''
+        spectrogram : [batch_size, time_step, frequency_bin] complex64
+        irfft -> inverse_stft_window -> overlap-add : [batch_size, (time_step - 1) * hop + window_length]
+        padding = "same" crops it like Conv2DTranspose : [batch_size, time_step * hop, 1]
+        irfft runs in float32, the signal is cast to the compute dtype (mixed precision)
+        '''
+        frames = tf.signal.irfft(spectrogram, fft_length = [self.window_length])
+        frames = frames * tf.constant(self.inverse_window, dtype = frames.dtype)
+        signal = tf.signal.overlap_and_add(frames, self.over_lapping)
+
+        'Conv2DTranspose outputs at least time_step * hop samples'
+        if self.over_lapping > self.window_length:
+            signal = tf.pad(signal, [[0, 0], [0, self.over_lapping - self.window_length]])
+
+        if self.padding == "same":
+            pad_total = max(self.window_length - self.over_lapping, 0)
+            pad_left  = pad_total // 2
+            signal_length = tf.shape(spectrogram)[1] * self.over_lapping
+            signal = signal[:, pad_left : pad_left + signal_length]
+
+        return tf.cast(signal[:, :, None], self.compute_dtype)
+
+
+
+'Streaming Short Time Fourier Transform'
+class STFT_stream (STFT_network):
+    '''
+    Stateful STFT_network(engine = "fft") for chunked real-time audio.
+    Push chunks of any length : [batch_size, chunk_length, 1], only the frames completed by the chunk are returned.
+    The window_length - hop samples not yet framed are kept as state, so one chunk costs at most the new frames.
+
+    Concatenating the outputs of every call and flush() is equal to STFT_network(engine = "fft") on the whole signal.
+    padding = "same" starts the state with the left padding zeros of the offline layer, flush() adds the right padding.
+    The offline left padding (window_length - signal_length % hop) // 2 depends on the whole length, a stream can not know it
+    when it emits its first frames, so with padding = "same" the whole signal length must be a multiple of hop,
+    flush() raises InvalidArgumentError otherwise (any length with "valid").
+    Call reset_states() before a new stream.
+    '''
+
+    def __init__ (self, window_length = 1024, over_lapping = 256, padding = "same", return_complex = False):
+
+        super(STFT_stream, self).__init__(window_length = window_length, over_lapping = over_lapping, padding = padding,
+                                          return_complex = return_complex, engine = "fft")
+
+
+    def build (self, inputs_shape):
+
+        if inputs_shape[-1] not in [None, 1]:
+            raise ValueError('STFT_stream takes one channel [batch_size, chunk_length, 1], but got ' + str(inputs_shape[-1]) + ' channels.')
+
+        batch_size = inputs_shape[0] if inputs_shape[0] is not None else 1
+        self.signal_buffer = tf.Variable(tf.zeros([batch_size, 0]), shape = tf.TensorShape([None, None]), trainable = False, name = "signal_buffer")
+        self.signal_length = tf.Variable(0, trainable = False, name = "signal_length")
+        self.reset_states(batch_size)
+
+        super(STFT_stream, self).build(inputs_shape)
+
+
+    def reset_states (self, batch_size = None):
+
+        if batch_size is None:
+            batch_size = tf.shape(self.signal_buffer)[0]
+
+        'padding = "same" : the offline layer pads (window_length - hop) // 2 zeros on the left'
+        pad_left = max(self.window_length - self.over_lapping, 0) // 2 if self.padding == "same" else 0
+        self.signal_buffer.assign(tf.zeros([batch_size, pad_left]))
+        self.signal_length.assign(0)
+
+
+    def stream_frames (self, signal):
+
+        'frames every complete window of signal, keeps the rest as state'
+        frames = tf.signal.frame(signal, frame_length = self.window_length, frame_step = self.over_lapping)
+        consumed = tf.shape(frames)[1] * self.over_lapping
+        self.signal_buffer.assign(signal[:, consumed:])
+
+        window = tf.constant(self.discrete_fourier_transform_window[0], dtype = frames.dtype)
+        spectrogram = tf.signal.rfft(frames * window, fft_length = [self.window_length])
+
+        if self.return_complex:
+            return spectrogram
+        return cast_pair(*split_complex(spectrogram), self.compute_dtype)
+
+
+    def call (self, input_signal):
+
+        'input_signal : 3D Tensor [batch_size, chunk_length, 1]'
+        chunk = tf.cast(input_signal[:, :, 0], self.signal_buffer.dtype)
+        self.signal_length.assign_add(tf.shape(chunk)[1])
+
+        return self.stream_frames(tf.concat([self.signal_buffer, chunk], axis = 1))
+
+
+    def flush (self):
+
+        'emits the frames the offline layer gets from its right padding, then the stream is finished'
+        signal = self.signal_buffer
+        if self.padding == "same":
+            tf.debugging.assert_equal(self.signal_length % self.over_lapping, 0,
+                                      message = 'STFT_stream(padding = "same") needs a signal length multiple of the hop, the first frames were padded for one')
+            pad_left  = max(self.window_length - self.over_lapping, 0) // 2
+            frame_number = -(-self.signal_length // self.over_lapping)
+            pad_right = tf.maximum((frame_number - 1) * self.over_lapping + self.window_length - pad_left - self.signal_length, 0)
+            signal = tf.pad(signal, [[0, 0], [0, pad_right]])
+
+        return self.stream_frames(signal)
+
+
+'Streaming Inverse Short Time Fourier Transform'
+class ISTFT_stream (ISTFT_network):
+    '''
+    Stateful ISTFT_network(engine = "fft") for chunked real-time audio.
+    Push spectrogram chunks of any number of frames : [batch_size, frame_number, frequency_bin],
+    every call returns the frame_number * hop samples that no later frame overlaps : [batch_size, samples, 1].
+    The last ceil(window_length / hop) - 1 windowed frames are kept as the overlap-add tail.
+
+    Concatenating the outputs of every call and flush() is equal to ISTFT_network(engine = "fft") on the whole spectrogram,
+    overlap_and_add sums each output sample over the same frames in the same order, so the samples are bit for bit equal.
+    padding = "same" drops the (window_length - hop) // 2 samples the offline layer crops (warm-up).
+    Call reset_states() before a new stream.
+    '''
+
+    def __init__ (self, window_length = 1024, over_lapping = 256, padding = "same"):
+
+        super(ISTFT_stream, self).__init__(window_length = window_length, over_lapping = over_lapping, padding = padding, engine = "fft")
+
+        self.tail_frames = -(-self.window_length // self.over_lapping) - 1
+
+
+    def build (self, inputs_shape):
+
+        batch_size = inputs_shape[0] if inputs_shape[0] is not None else 1
+        self.frame_buffer  = tf.Variable(tf.zeros([batch_size, self.tail_frames, self.window_length]), shape = tf.TensorShape([None, None, self.window_length]),
+                                         trainable = False, name = "frame_buffer")
+        self.samples_to_skip = tf.Variable(0, trainable = False, name = "samples_to_skip")
+        self.reset_states(batch_size)
+
+        super(ISTFT_stream, self).build(inputs_shape)
+
+
+    def reset_states (self, batch_size = None):
+
+        if batch_size is None:
+            batch_size = tf.shape(self.frame_buffer)[0]
+
+        self.frame_buffer.assign(tf.zeros([batch_size, self.tail_frames, self.window_length]))
+        self.samples_to_skip.assign(max(self.window_length - self.over_lapping, 0) // 2 if self.padding == "same" else 0)
+
+
+    def overlap_add (self, frames):
+
+        'overlap-adds the tail and the new frames, returns the samples of the new frames hops'
+        frames = tf.concat([self.frame_buffer, frames], axis = 1)
+        new_frames = tf.shape(frames)[1] - self.tail_frames
+        self.frame_buffer.assign(frames[:, new_frames:])
+
+        signal = tf.signal.overlap_and_add(frames, self.over_lapping)
+        signal = signal[:, self.tail_frames * self.over_lapping : (self.tail_frames + new_frames) * self.over_lapping]
+
+        skip = tf.minimum(self.samples_to_skip, tf.shape(signal)[1])
+        self.samples_to_skip.assign_sub(skip)
+
+        return signal[:, skip:]
+
+
+    def call (self, real, imag = None):
+
+        spectrogram = real if imag is None else merge_complex(real, imag)
+
+        frames = tf.signal.irfft(spectrogram, fft_length = [self.window_length])
+        frames = frames * tf.constant(self.inverse_window, dtype = frames.dtype)
+
+        return tf.cast(self.overlap_add(frames)[:, :, None], self.compute_dtype)
+
+
+    def flush (self):
+
+        'emits the rest of the overlap-add tail the offline layer outputs, then the stream is finished'
+        batch_size = tf.shape(self.frame_buffer)[0]
+        signal = self.overlap_add(tf.zeros([batch_size, self.tail_frames, self.window_length]))
+
+        if self.padding == "same":
+            signal = signal[:, :max(self.window_length - self.over_lapping, 0) // 2]
+        else:
+            signal = signal[:, :max(self.window_length - self.over_lapping, 0)]
+
+        return tf.cast(signal[:, :, None], self.compute_dtype)
+
+if __name__ == "__main__":
+
+    '''
+    STFT_network engine = "fft" Test,
+    rfft outputs must be same as DFT convolution outputs
+    '''
+    signal = tf.random.normal([2, 16384, 1])
+    for padding in ["same", "valid"]:
+        conv_real, conv_imag = STFT_network(padding = padding, engine = "conv")(signal)
+        fft_real, fft_imag   = STFT_network(padding = padding, engine = "fft")(signal)
+        print(padding, fft_real.shape, np.allclose(conv_real, fft_real, atol = 1e-3), np.allclose(conv_imag, fft_imag, atol = 1e-3))
+        fused_real, fused_imag = STFT_network(padding = padding, engine = "fused_conv")(signal)
+        print(padding, fused_real.shape, np.allclose(conv_real, fused_real, atol = 1e-3), np.allclose(conv_imag, fused_imag, atol = 1e-3))
+
+        '''
+        ISTFT_network engine = "fft" Test,
+        overlap-add outputs must be same as Conv2DTranspose outputs
+        '''
+        conv_signal = ISTFT_network(padding = padding, engine = "conv")(conv_real, conv_imag)
+        fft_signal  = ISTFT_network(padding = padding, engine = "fft")(conv_real, conv_imag)
+        print(padding, fft_signal.shape, np.allclose(conv_signal, fft_signal, atol = 1e-3))
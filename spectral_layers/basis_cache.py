@@ -0,0 +1,166 @@
+import os
+import threading
+import collections
+
+import numpy as np
+import scipy.signal
+"""
+Process-wide cache of the STFT_network / ISTFT_network constants.
+
+    analysis_window  (window_length, window)                 : [window_length]
+    stft_kernel      (window_length, window, dtype)          : real, imag [window_length, 1, frequency_bin], views of stft_fused_kernel
+    stft_fused_kernel(window_length, window, dtype)          : [window_length, 1, 2 * frequency_bin]
+    istft_window     (window_length, hop, window, dtype)     : inverse_window [window_length]
+    istft_kernel     (window_length, hop, window, dtype)     : inverse_window [window_length], inverse_basis [window_length, 1, 1, 2 * frequency_bin]
+
+Entries are keyed by (name, window_length, hop, window type, dtype) and evicted least recently used
+when more than max_entries are held. Cached arrays are read-only and shared by every layer.
+
+With set_basis_cache_dir(path) (or the SPECTRAL_BASIS_CACHE_DIR environment variable) every entry is also
+written once as <path>/<key>.npy and loaded memory-mapped, so other processes and worker restarts
+reuse the bases instead of recomputing np.fft.fft(np.eye(N)) and np.linalg.pinv.
+"""
+
+
+_lock    = threading.RLock()
+_entries = collections.OrderedDict()
+_config  = {"max_entries" : 16, "cache_dir" : os.environ.get("SPECTRAL_BASIS_CACHE_DIR")}
+
+
+def set_basis_cache_size (max_entries):
+
+    with _lock:
+        _config["max_entries"] = max_entries
+        _evict()
+
+
+def set_basis_cache_dir (cache_dir):
+
+    'None disables the on-disk store'
+    with _lock:
+        _config["cache_dir"] = cache_dir
+
+
+def clear_basis_cache ():
+
+    'clears the in-memory entries, the on-disk store is kept'
+    with _lock:
+        _entries.clear()
+
+
+def _evict ():
+
+    while len(_entries) > _config["max_entries"]:
+        _entries.popitem(last = False)
+
+
+def _file_name (key):
+
+    return "_".join(str(part) for part in key) + ".npy"
+
+
+def _cached (key, compute):
+    '''
+    key     : (name, window_length, hop, window, dtype)
+    compute : function returning one numpy array
+    '''
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+            return _entries[key]
+
+        value = None
+        cache_dir = _config["cache_dir"]
+        if cache_dir is not None:
+            path = os.path.join(cache_dir, _file_name(key))
+            if not os.path.exists(path):
+                os.makedirs(cache_dir, exist_ok = True)
+                'write then rename, so concurrent workers never load a partial file'
+                temp_path = path + "." + str(os.getpid()) + ".tmp"
+                with open(temp_path, "wb") as file:
+                    np.save(file, compute())
+                os.replace(temp_path, path)
+            value = np.load(path, mmap_mode = "r")
+
+        if value is None:
+            value = compute()
+            value.flags.writeable = False
+
+        _entries[key] = value
+        _evict()
+
+        return value
+
+
+def inverse_stft_window (window, hop_length):
+
+    'Ceiling Division'
+    window_length = len(window)
+    denom = window ** 2
+    overlaps = -(-window_length // hop_length)
+    denom = np.pad(denom, (0, overlaps * hop_length - window_length), 'constant')
+    denom = np.reshape(denom, (overlaps, hop_length)).sum(0)
+    denom = np.tile(denom, (overlaps, 1)).reshape(overlaps * hop_length)
+
+    return window / denom[:window_length]
+
+
+def analysis_window (window_length, window = "hann"):
+
+    'periodic window, scipy.signal.get_window("hann", N) == scipy.signal.hann(N, sym = False)'
+    return _cached(("window", window_length, None, window, "float64"),
+                   lambda: scipy.signal.get_window(window, window_length))
+
+
+def stft_kernel (window_length, window = "hann", dtype = "float32"):
+    '''
+    windowed DFT kernel of STFT_network(engine = "conv"), does not depend on the hop
+    returns real, imag : [window_length, 1, frequency_bin], views of the one cached stft_fused_kernel entry
+    '''
+    kernel = stft_fused_kernel(window_length, window, dtype)
+    frequency_bin = window_length // 2 + 1
+
+    return kernel[..., :frequency_bin], kernel[..., frequency_bin:]
+
+
+def stft_fused_kernel (window_length, window = "hann", dtype = "float32"):
+    '''
+    cosine and sine kernels stacked on the filter axis, STFT_network(engine = "fused_conv")
+    returns kernel : [window_length, 1, 2 * frequency_bin], real filters first
+    '''
+    frequency_bin = window_length // 2 + 1
+
+    def compute ():
+        fourier_basis = np.fft.fft(np.eye(window_length))
+        kernel = np.multiply(fourier_basis, analysis_window(window_length, window).reshape((1, -1)))
+        kernel = kernel[:frequency_bin, :].T[:, None, :]
+        return np.concatenate([np.real(kernel), np.imag(kernel)], axis = -1).astype(dtype)
+
+    return _cached(("stft_fused_kernel", window_length, None, window, str(np.dtype(dtype))), compute)
+
+
+def istft_window (window_length, hop_length, window = "hann", dtype = "float32"):
+
+    'overlap-add normalized synthesis window of ISTFT_network : [window_length]'
+    return _cached(("istft_window", window_length, hop_length, window, str(np.dtype(dtype))),
+                   lambda: inverse_stft_window(analysis_window(window_length, window), hop_length).astype(dtype))
+
+
+def istft_kernel (window_length, hop_length, window = "hann", dtype = "float32"):
+    '''
+    inverse window and pinv(DFT) kernel of ISTFT_network
+    returns inverse_window : [window_length]
+            inverse_basis  : [window_length, 1, 1, 2 * frequency_bin]
+    '''
+    frequency_bin  = window_length // 2 + 1
+    inverse_window = istft_window(window_length, hop_length, window, dtype)
+
+    def compute ():
+        fourier_basis = np.fft.fft(np.eye(window_length))
+        fourier_basis = np.vstack([np.real(fourier_basis[:frequency_bin, :]), np.imag(fourier_basis[:frequency_bin, :])])
+        inverse_basis = inverse_stft_window(analysis_window(window_length, window), hop_length) * np.linalg.pinv(fourier_basis).T[:, None, None, ]
+        return inverse_basis.T.astype(dtype)
+
+    inverse_basis = _cached(("istft_kernel", window_length, hop_length, window, str(np.dtype(dtype))), compute)
+
+    return inverse_window, inverse_basis
@@ -0,0 +1,5 @@
+import tensorflow as tf
+
+
+'two logical CPU devices for the tf.distribute tests, must be set before TensorFlow initializes its devices'
+tf.config.set_logical_device_configuration(tf.config.list_physical_devices('CPU')[0], [tf.config.LogicalDeviceConfiguration()] * 2)
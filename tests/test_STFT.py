@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from spectral_layers.STFT import *
+
+
+@pytest.mark.parametrize("engine", ["fft", "fused_conv"])
+@pytest.mark.parametrize("padding", ["same", "valid"])
+def test_engine_matches_conv (engine, padding):
+
+    signal = tf.random.normal([2, 4000, 1])
+    conv_real, conv_imag = STFT_network(window_length = 256, over_lapping = 64, padding = padding, engine = "conv")(signal)
+    real, imag = STFT_network(window_length = 256, over_lapping = 64, padding = padding, engine = engine)(signal)
+
+    assert real.shape == conv_real.shape
+    np.testing.assert_allclose(real, conv_real, atol = 1e-3)
+    np.testing.assert_allclose(imag, conv_imag, atol = 1e-3)
+
+
+@pytest.mark.parametrize("engine", ["conv", "fused_conv", "fft"])
+def test_multi_channel_transforms_every_channel (engine):
+
+    signal = tf.random.normal([2, 4000, 3])
+    layer  = STFT_network(window_length = 256, over_lapping = 64, engine = engine)
+    real, imag = layer(signal)
+    assert real.shape == (2, 63, 129, 3)
+
+    for channel in range(3):
+        channel_real, channel_imag = STFT_network(window_length = 256, over_lapping = 64, engine = "conv")(signal[:, :, channel : channel + 1])
+        np.testing.assert_allclose(real[..., channel], channel_real, atol = 1e-3)
+        np.testing.assert_allclose(imag[..., channel], channel_imag, atol = 1e-3)
+
+    spectrogram = STFT_network(window_length = 256, over_lapping = 64, engine = engine, return_complex = True)(signal)
+    np.testing.assert_allclose(spectrogram, tf.complex(real, imag), atol = 1e-3)
+
+
+@pytest.mark.parametrize("padding", ["same", "valid"])
+def test_istft_fft_matches_conv (padding):
+
+    real, imag = STFT_network(window_length = 256, over_lapping = 64, padding = padding, engine = "fft")(tf.random.normal([2, 4096, 1]))
+    conv_signal = ISTFT_network(window_length = 256, over_lapping = 64, padding = padding, engine = "conv")(real, imag)
+    fft_signal  = ISTFT_network(window_length = 256, over_lapping = 64, padding = padding, engine = "fft")(real, imag)
+
+    assert fft_signal.shape == conv_signal.shape
+    np.testing.assert_allclose(fft_signal, conv_signal, atol = 1e-3)
+
+
+def test_stream_rejects_multi_channel ():
+
+    with pytest.raises(ValueError):
+        STFT_stream(window_length = 256, over_lapping = 64)(tf.random.normal([1, 512, 2]))
+
+
+def random_chunks (length, seed, largest):
+
+    'chunks of 1 to largest - 1 samples (frames) that cover length'
+    sizes  = np.random.RandomState(seed).randint(1, largest, size = length)
+    bounds = np.unique(np.concatenate([[0], np.cumsum(sizes)[np.cumsum(sizes) < length], [length]]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+@pytest.mark.parametrize("padding", ["same", "valid"])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_stream_matches_offline_exactly (padding, seed):
+
+    'random chunks through STFT_stream and ISTFT_stream, then flush, equal bit for bit to the offline fft engines'
+    signal  = tf.random.normal([2, 64 * 60 + (37 if padding == "valid" else 0), 1], seed = seed)
+    offline = STFT_network(window_length = 256, over_lapping = 64, padding = padding, engine = "fft", return_complex = True)(signal)
+
+    stream = STFT_stream(window_length = 256, over_lapping = 64, padding = padding, return_complex = True)
+    frames = [stream(signal[:, start : end]) for start, end in random_chunks(signal.shape[1], seed, 300)] + [stream.flush()]
+    np.testing.assert_array_equal(tf.concat(frames, axis = 1), offline)
+
+    offline_signal = ISTFT_network(window_length = 256, over_lapping = 64, padding = padding, engine = "fft")(offline)
+    stream = ISTFT_stream(window_length = 256, over_lapping = 64, padding = padding)
+    samples = [stream(offline[:, start : end]) for start, end in random_chunks(offline.shape[1], seed, 6)] + [stream.flush()]
+    np.testing.assert_array_equal(tf.concat(samples, axis = 1), offline_signal)
+
+
+def test_stream_same_padding_needs_a_multiple_of_hop ():
+
+    stream = STFT_stream(window_length = 256, over_lapping = 64)
+    stream(tf.random.normal([1, 64 * 10 + 5, 1]))
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        stream.flush()
@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.activations import *
+
+
+@pytest.mark.parametrize("layer", [complex_CReLU, complex_zReLU, complex_modReLU, complex_LeakyReLU, complex_Tanh, complex_Flatten])
+@pytest.mark.parametrize("jit_compile", [True, False])
+def test_complex64_activation_matches_pairs (layer, jit_compile):
+
+    real = tf.random.normal([4, 6, 8])
+    imag = tf.random.normal([4, 6, 8])
+    layer = layer(jit_compile = jit_compile) if layer in [complex_zReLU, complex_modReLU] else layer()
+    real_outputs, imag_outputs = layer(real, imag)
+
+    outputs = layer(tf.complex(real, imag))
+    assert outputs.dtype == tf.complex64
+    np.testing.assert_allclose(outputs, tf.complex(real_outputs, imag_outputs), atol = 1e-6)
+
+
+def test_complex64_softmax_matches_pairs ():
+
+    real = tf.random.normal([4, 6, 8])
+    imag = tf.random.normal([4, 6, 8])
+    np.testing.assert_allclose(complex_Softmax()(tf.complex(real, imag)), complex_Softmax()(real, imag), atol = 1e-6)
+
+
+ACTIVATION_LAYERS = [complex_CReLU, complex_zReLU, complex_modReLU, complex_LeakyReLU, complex_Tanh, complex_Flatten, complex_Softmax]
+
+
+def test_modrelu_creates_its_bias_once ():
+
+    'the bias is built once, repeated eager and traced calls add no variable and do not retrace the kernel'
+    layer = complex_modReLU(bias_initializer = 'glorot_uniform')
+    step  = tf.function(layer)
+    for _ in range(5):
+        shape = [4, 6, 8]
+        layer(tf.random.normal(shape), tf.random.normal(shape))
+        step(tf.random.normal(shape), tf.random.normal(shape))
+
+    assert layer.weights == [layer.bias] and layer.bias.shape == (8,)
+    assert step.experimental_get_tracing_count() == 1
+
+
+@pytest.mark.parametrize("layer", ACTIVATION_LAYERS)
+def test_activation_config_round_trip (layer):
+
+    real = tf.random.normal([4, 6, 8])
+    imag = tf.random.normal([4, 6, 8])
+    layer = layer()
+    outputs = layer(real, imag)
+
+    clone = type(layer).from_config(layer.get_config())
+    clone(real, imag)
+    clone.set_weights(layer.get_weights())
+    assert clone.get_config() == layer.get_config()
+    for output, clone_output in zip(tf.nest.flatten(outputs), tf.nest.flatten(clone(real, imag))):
+        np.testing.assert_array_equal(clone_output, output)
+
+
+def reference_zrelu (z):
+
+    return np.where((z.real > 0) & (z.imag > 0), z, 0)
+
+
+def reference_modrelu (z, bias, epsilon = 1e-5):
+
+    'z * relu(|z| + b) / (|z| + eps)'
+    return z * np.maximum(np.abs(z) + bias, 0) / (np.abs(z) + epsilon)
+
+
+def reference_softmax (z, axis = -1):
+
+    e = np.exp(np.abs(z) - np.max(np.abs(z), axis = axis, keepdims = True))
+    return e / np.sum(e, axis = axis, keepdims = True)
+
+
+@pytest.mark.parametrize("jit_compile", [True, False])
+def test_fused_kernels_match_reference (jit_compile):
+
+    real = tf.random.normal([4, 6, 8])
+    imag = tf.random.normal([4, 6, 8])
+    bias = tf.random.uniform([8], -1.0, 0.5)
+    z    = real.numpy() + 1j * imag.numpy()
+
+    for function, reference in [(lambda *inputs: zReLU(*inputs, jit_compile = jit_compile), reference_zrelu(z)),
+                                (lambda *inputs: modReLU(*inputs, bias = bias, jit_compile = jit_compile), reference_modrelu(z, bias.numpy())),
+                                (lambda *inputs: complex_softmax(*inputs, axis = 1, jit_compile = jit_compile), reference_softmax(z, axis = 1))]:
+        outputs = function(real, imag)
+        outputs = tf.complex(*outputs) if isinstance(outputs, tuple) else outputs
+        np.testing.assert_allclose(outputs, reference, rtol = 1e-5, atol = 1e-6)
+        np.testing.assert_allclose(function(tf.complex(real, imag)), reference, rtol = 1e-5, atol = 1e-6)
+
+
+@pytest.mark.parametrize("jit_compile", [True, False])
+def test_fused_kernel_gradients_match_reference (jit_compile):
+
+    'gradients of the fused kernels against the unfused formulas (tf.complex, tf.abs), inputs away from |z| = 0 and the zReLU edges'
+    real = tf.random.normal([4, 6, 8])
+    imag = tf.random.normal([4, 6, 8])
+    real = tf.where(tf.abs(real) < 0.05, 0.5, real)
+    imag = tf.where(tf.abs(imag) < 0.05, 0.5, imag)
+    bias = tf.Variable(tf.random.uniform([8], -1.0, 0.5))
+    weights = [tf.random.normal([4, 6, 8]) for _ in range(2)]
+
+    def reference_modrelu (real, imag):
+        norm  = tf.abs(tf.complex(real, imag))
+        scale = tf.nn.relu(norm + bias) / (norm + 1e-5)
+        return real * scale, imag * scale
+
+    def reference_zrelu (real, imag):
+        mask = tf.cast(tf.logical_and(real > 0, imag > 0), real.dtype)
+        return real * mask, imag * mask
+
+    def reference_softmax (real, imag):
+        return tf.nn.softmax(tf.abs(tf.complex(real, imag)), axis = -1), tf.zeros_like(real)
+
+    for function, reference in [(lambda real, imag: zReLU(real, imag, jit_compile = jit_compile), reference_zrelu),
+                                (lambda real, imag: modReLU(real, imag, bias = bias, jit_compile = jit_compile), reference_modrelu),
+                                (lambda real, imag: (complex_softmax(real, imag, jit_compile = jit_compile), tf.zeros_like(real)), reference_softmax)]:
+        gradients = []
+        for activation in [function, reference]:
+            with tf.GradientTape() as tape:
+                tape.watch([real, imag])
+                outputs = activation(real, imag)
+                loss = tf.reduce_sum(outputs[0] * weights[0]) + tf.reduce_sum(outputs[1] * weights[1])
+            gradients.append(tape.gradient(loss, [real, imag, bias], unconnected_gradients = tf.UnconnectedGradients.ZERO))
+
+        for fused, expected in zip(*gradients):
+            np.testing.assert_allclose(fused, expected, rtol = 1e-4, atol = 1e-5)
+
+
+def test_modrelu_gradient_is_finite_at_zero ():
+
+    'the magnitude is clamped at the smallest normal float, tf.abs of a complex 0 has a nan gradient'
+    real = tf.constant([0.0, 1.0])
+    imag = tf.constant([0.0, 0.0])
+    with tf.GradientTape() as tape:
+        tape.watch([real, imag])
+        loss = tf.reduce_sum(tf.stack(modReLU(real, imag, bias = tf.constant(0.5))))
+
+    assert np.all(np.isfinite(tape.gradient(loss, [real, imag])))
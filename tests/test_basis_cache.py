@@ -0,0 +1,25 @@
+import numpy as np
+
+from spectral_layers import basis_cache
+
+
+def test_stft_kernels_share_one_entry (tmp_path):
+
+    basis_cache.clear_basis_cache()
+    basis_cache.set_basis_cache_dir(str(tmp_path))
+    try:
+        real_kernel, imag_kernel = basis_cache.stft_kernel(64)
+        fused_kernel = basis_cache.stft_fused_kernel(64)
+    finally:
+        basis_cache.set_basis_cache_dir(None)
+
+    kernels = [key for key in basis_cache._entries if key[0].startswith("stft")]
+    assert kernels == [("stft_fused_kernel", 64, None, "hann", "float32")]
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith("stft")] == ["stft_fused_kernel_64_None_hann_float32.npy"]
+
+    np.testing.assert_array_equal(np.concatenate([real_kernel, imag_kernel], axis = -1), fused_kernel)
+    'kernel[t, f] = window[t] exp(-2 pi i f t / N)'
+    time, frequency = np.arange(64)[:, None], np.arange(33)[None, :]
+    kernel = basis_cache.analysis_window(64)[:, None] * np.exp(-2j * np.pi * frequency * time / 64)
+    np.testing.assert_allclose(real_kernel[:, 0, :], np.real(kernel), atol = 1e-5)
+    np.testing.assert_allclose(imag_kernel[:, 0, :], np.imag(kernel), atol = 1e-5)
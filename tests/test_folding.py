@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.networks import *
+from complex_layers.normalization import *
+from complex_layers.folding import *
+
+
+CUSTOM_OBJECTS = {"complex_Dense" : complex_Dense, "complex_Conv1D" : complex_Conv1D, "complex_Conv2D" : complex_Conv2D, "complex_Conv3D" : complex_Conv3D,
+                  "complex_FusedBatchNorm" : complex_FusedBatchNorm, "complex_BatchNorm" : complex_BatchNorm}
+
+
+def batchnorm_model ():
+
+    'Conv2D -> BN, Conv1D -> concat BN, Dense -> BN, momentum = 1.0 keeps the moving statistics fixed'
+    real_inputs = tf.keras.Input(shape = (8, 8, 2))
+    imag_inputs = tf.keras.Input(shape = (8, 8, 2))
+    real, imag = complex_Conv2D(filters = 4, strides = (1, 1), bias_initializer = 'glorot_uniform')(real_inputs, imag_inputs)
+    real, imag = complex_FusedBatchNorm(momentum = 1.0)(real, imag)
+    real, imag = complex_Conv1D(filters = 4, kernel_size = 3)(tf.reshape(real, [-1, 64, 4]), tf.reshape(imag, [-1, 64, 4]))
+    outputs    = complex_BatchNorm(momentum = 1.0)(tf.concat([real, imag], axis = -1))
+    real, imag = tf.split(outputs, 2, axis = -1)
+    real, imag = complex_Dense(units = 3)(real, imag)
+    real, imag = complex_FusedBatchNorm(momentum = 1.0)(real, imag)
+    model = tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+
+    'random statistics, so that every batch norm is a non trivial map'
+    for layer in model.layers:
+        if isinstance(layer, complex_FusedBatchNorm):
+            layer.set_weights([np.random.uniform(0.5, 1.5, weight.shape) if 'V' in weight.name and 'Vri' not in weight.name else np.random.uniform(-0.3, 0.3, weight.shape) for weight in layer.weights])
+
+    return model
+
+
+def test_freeze_removes_batchnorm ():
+
+    model  = batchnorm_model()
+    inputs = [tf.random.normal([2, 8, 8, 2]), tf.random.normal([2, 8, 8, 2])]
+    weight_count = len(model.get_weights())
+
+    frozen = freeze_for_inference(model)
+    assert not [layer for layer in frozen.layers if isinstance(layer, complex_FusedBatchNorm)]
+    assert [layer.inference for layer in frozen.layers if isinstance(layer, FOLDABLE_LAYERS)] == [{"folded" : True, "quantized" : False, "quantized_inputs" : False, "kept_filters" : None, "sparse_entries" : None}] * 3
+    for bn_outputs, folded_outputs in zip(model(inputs), frozen(inputs)):
+        np.testing.assert_allclose(folded_outputs, bn_outputs, atol = 1e-4)
+
+    'the batch norm model is not changed'
+    assert len(model.get_weights()) == weight_count
+    assert len([layer for layer in model.layers if isinstance(layer, complex_FusedBatchNorm)]) == 3
+
+
+def test_frozen_model_saves_and_reloads (tmp_path):
+
+    model  = batchnorm_model()
+    inputs = [tf.random.normal([2, 8, 8, 2]), tf.random.normal([2, 8, 8, 2])]
+    frozen = freeze_for_inference(model)
+    outputs = frozen(inputs)
+
+    frozen.save(str(tmp_path / "frozen.keras"))
+    reloaded = tf.keras.models.load_model(str(tmp_path / "frozen.keras"), custom_objects = CUSTOM_OBJECTS)
+    for frozen_outputs, reloaded_outputs in zip(outputs, reloaded(inputs)):
+        np.testing.assert_allclose(reloaded_outputs, frozen_outputs, atol = 1e-6)
+
+    'same weights in the same order from the config alone'
+    clone = tf.keras.Model.from_config(frozen.get_config(), custom_objects = CUSTOM_OBJECTS)
+    clone.set_weights(frozen.get_weights())
+    for frozen_outputs, clone_outputs in zip(outputs, clone(inputs)):
+        np.testing.assert_allclose(clone_outputs, frozen_outputs, atol = 1e-6)
+
+
+@pytest.mark.parametrize("layer, shape", [(lambda: complex_Dense(units = 5, bias_initializer = 'glorot_uniform'), [3, 4]),
+                                          (lambda: complex_Conv1D(filters = 5, kernel_size = 3, padding = "causal", dilation_rate = 2), [3, 16, 4]),
+                                          (lambda: complex_Conv2D(filters = 5, strides = (2, 1)), [3, 9, 9, 4]),
+                                          (lambda: complex_Conv3D(filters = 5), [3, 5, 6, 6, 4])])
+def test_inference_layer_matches_layer (layer, shape):
+
+    layer  = layer()
+    inputs = [tf.random.normal(shape), tf.random.normal(shape)]
+    outputs = layer(*inputs)
+
+    copy = layer.inference_layer(*layer.block_weights())
+    assert len(copy.weights) == 2 and copy.built
+    for layer_outputs, copy_outputs in zip(outputs, copy(*inputs)):
+        np.testing.assert_allclose(copy_outputs, layer_outputs, atol = 1e-5)
+
+    'training form config round trip'
+    clone = type(layer).from_config(layer.get_config())
+    clone(*inputs)
+    clone.set_weights(layer.get_weights())
+    for layer_outputs, clone_outputs in zip(outputs, clone(*inputs)):
+        np.testing.assert_allclose(clone_outputs, layer_outputs, atol = 1e-6)
@@ -0,0 +1,85 @@
+import warnings
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.networks import *
+from complex_layers.normalization import *
+from complex_layers.instrumentation import *
+
+
+def profiled_flops (layer, inputs):
+
+    'FLOPs of one call from the TensorFlow profiler (registered op statistics), independent of the analytic counters'
+    graph   = tf.function(layer).get_concrete_function(inputs).graph
+    options = tf.compat.v1.profiler.ProfileOptionBuilder.float_operation()
+    options["output"] = "none"
+    return tf.compat.v1.profiler.profile(graph, options = options).total_float_ops
+
+
+def instrumented_model ():
+
+    real_inputs = tf.keras.Input(shape = (32, 32, 4))
+    imag_inputs = tf.keras.Input(shape = (32, 32, 4))
+    real, imag = complex_Conv2D(filters = 8, use_bias = False)(real_inputs, imag_inputs)
+    real, imag = complex_FusedBatchNorm()(real, imag)
+    real, imag = complex_Conv2D(filters = 8, use_bias = False, gauss = True)(real, imag)
+    return tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+
+
+@pytest.fixture
+def recording ():
+
+    reset_instrumentation()
+    with instrumentation():
+        yield
+    reset_instrumentation()
+
+
+def test_complex_convolution_costs_four_real_convolutions (recording):
+
+    'four real convolutions, three with gauss = True, each the profiled cost of one real Conv2D of the same shape'
+    model  = instrumented_model()
+    inputs = [tf.random.normal([2, 32, 32, 4]), tf.random.normal([2, 32, 32, 4])]
+    for _ in range(3):
+        model(inputs)
+    rows = instrumentation_report(model, print_fn = None)
+
+    first_real_flops  = profiled_flops(tf.keras.layers.Conv2D(8, 3, strides = 2, padding = "same", use_bias = False), inputs[0])
+    second_real_flops = profiled_flops(tf.keras.layers.Conv2D(8, 3, strides = 2, padding = "same", use_bias = False), tf.random.normal([2, 16, 16, 8]))
+    assert [row["type"] for row in rows] == ["complex_Conv2D", "complex_FusedBatchNorm", "complex_Conv2D"]
+    assert [row["calls"] for row in rows] == [3, 3, 3]
+    assert rows[0]["flops_per_call"] == 4 * first_real_flops
+    assert rows[2]["flops_per_call"] == 3 * second_real_flops
+    assert rows[0]["activation_bytes_per_call"] == 2 * 2 * 16 * 16 * 8 * 4
+    assert all(row["seconds"] > 0 for row in rows)
+
+
+def test_instrumentation_off_restores_the_layer_calls ():
+
+    'off is zero overhead : every class runs its own call again, no wrapper, nothing is recorded'
+    calls = {layer_class : layer_class.__dict__["call"] for layer_class in layer_classes()}
+    model = instrumented_model()
+    with instrumentation():
+        assert all(layer_class.call is not call for layer_class, call in calls.items())
+
+    assert all(layer_class.__dict__["call"] is call and not hasattr(call, "__wrapped__") for layer_class, call in calls.items())
+    reset_instrumentation()
+    model([tf.random.normal([1, 32, 32, 4]), tf.random.normal([1, 32, 32, 4])])
+    assert instrumentation_report(model, print_fn = None) == []
+
+
+def test_graph_calls_warn_once (recording):
+
+    'building the functional model does not warn, a traced call warns once per layer and is not recorded'
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        model = instrumented_model()
+
+    inputs = [tf.random.normal([2, 32, 32, 4]), tf.random.normal([2, 32, 32, 4])]
+    with pytest.warns(RuntimeWarning, match = "graph mode") as record:
+        tf.function(model)(inputs)
+        tf.function(model)(inputs)
+    assert len([warning for warning in record if issubclass(warning.category, RuntimeWarning)]) == 3
+    assert instrumentation_report(model, print_fn = None) == []
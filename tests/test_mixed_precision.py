@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.networks import *
+from complex_layers.normalization import *
+from complex_layers.activations import *
+from spectral_layers.STFT import *
+
+
+@pytest.fixture(params = ["mixed_float16", "mixed_bfloat16"])
+def policy (request):
+
+    tf.keras.mixed_precision.set_global_policy(request.param)
+    yield tf.keras.mixed_precision.global_policy()
+    tf.keras.mixed_precision.set_global_policy("float32")
+
+
+@pytest.mark.parametrize("layer, shape", [(lambda: complex_Dense(units = 8), [2, 16]),
+                                          (lambda: complex_Dense(units = 8, fused = True), [2, 16]),
+                                          (lambda: complex_Conv1D(filters = 4, kernel_size = 3), [2, 16, 3]),
+                                          (lambda: complex_Conv2D(filters = 4, gauss = True), [2, 8, 8, 3]),
+                                          (lambda: complex_Conv2DTranspose(filters = 4), [2, 8, 8, 3]),
+                                          (lambda: complex_Conv3D(filters = 4), [2, 4, 8, 8, 3]),
+                                          (lambda: complex_FusedBatchNorm(), [4, 8, 8, 3]),
+                                          (lambda: complex_LayerNorm(), [4, 8, 8, 3]),
+                                          (lambda: complex_modReLU(), [4, 8, 8, 3]),
+                                          (lambda: complex_zReLU(), [4, 8, 8, 3]),
+                                          (lambda: complex_MaxPool2D(), [4, 8, 8, 3])])
+def test_layer_computes_in_policy_dtype (policy, layer, shape):
+
+    'half precision compute, float32 variables'
+    layer = layer()
+    real_outputs, imag_outputs = layer(tf.random.normal(shape), tf.random.normal(shape))
+
+    assert real_outputs.dtype == imag_outputs.dtype == policy.compute_dtype
+    assert np.all(np.isfinite(real_outputs)) and np.all(np.isfinite(imag_outputs))
+    assert all(weight.dtype == tf.float32 for weight in layer.weights if weight.dtype.is_floating)
+
+
+def test_batchnorm_statistics_accumulate_in_float32 (policy):
+
+    'the moments and the whitening of a large mean run in float32, the half precision outputs stay normalized'
+    real = 100.0 + tf.random.normal([16, 8, 8, 3])
+    imag = -100.0 + tf.random.normal([16, 8, 8, 3])
+    layer = complex_FusedBatchNorm(momentum = 0.0)
+    real_outputs, imag_outputs = layer(real, imag, training = True)
+
+    assert real_outputs.dtype == policy.compute_dtype and layer.moving_Vrr.dtype == tf.float32
+    np.testing.assert_allclose(layer.moving_mean, np.concatenate([np.mean(real, axis = (0, 1, 2)), np.mean(imag, axis = (0, 1, 2))]), rtol = 1e-4)
+    np.testing.assert_allclose(np.var(np.asarray(real_outputs, np.float32)), 0.5, atol = 0.05)
+
+
+@pytest.mark.parametrize("engine", ["conv", "fused_conv", "fft"])
+def test_stft_computes_in_policy_dtype (policy, engine):
+
+    signal = tf.random.normal([2, 2048, 1])
+    layer  = STFT_network(window_length = 256, over_lapping = 64, engine = engine)
+    real, imag = layer(signal)
+    assert real.dtype == imag.dtype == policy.compute_dtype
+    assert all(weight.dtype == tf.float32 for weight in layer.weights)
+
+    outputs = ISTFT_network(window_length = 256, over_lapping = 64, engine = "fft" if engine == "fft" else "conv")(real, imag)
+    assert outputs.dtype == policy.compute_dtype
@@ -0,0 +1,222 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.networks import *
+
+
+def shared_weights (layer, reference, real, imag):
+
+    'builds layer and reference on (real, imag) and copies the weights of reference into layer'
+    reference(real, imag)
+    layer(real, imag)
+    layer.set_weights(reference.get_weights())
+
+
+@pytest.mark.parametrize("layer", [complex_Conv2D, complex_Conv2DTranspose])
+@pytest.mark.parametrize("strides, padding", [((1, 1), "same"), ((2, 2), "same"), ((2, 2), "valid")])
+def test_gauss_matches_four_convolutions (layer, strides, padding):
+
+    real = tf.random.normal([2, 17, 17, 3])
+    imag = tf.random.normal([2, 17, 17, 3])
+    four_conv  = layer(filters = 8, strides = strides, padding = padding, bias_initializer = 'glorot_uniform')
+    three_conv = layer(filters = 8, strides = strides, padding = padding, gauss = True)
+    shared_weights(three_conv, four_conv, real, imag)
+
+    for four_outputs, three_outputs in zip(four_conv(real, imag), three_conv(real, imag)):
+        assert three_outputs.shape == four_outputs.shape
+        np.testing.assert_allclose(three_outputs, four_outputs, atol = 1e-4)
+
+
+@pytest.mark.parametrize("layer", [complex_Conv2D, complex_Conv2DTranspose])
+def test_gauss_gradients_match_four_convolutions (layer):
+
+    real = tf.random.normal([2, 16, 16, 3])
+    imag = tf.random.normal([2, 16, 16, 3])
+    four_conv  = layer(filters = 4, bias_initializer = 'glorot_uniform')
+    three_conv = layer(filters = 4, gauss = True)
+    shared_weights(three_conv, four_conv, real, imag)
+
+    gradients = []
+    for conv in [four_conv, three_conv]:
+        with tf.GradientTape() as tape:
+            tape.watch([real, imag])
+            real_outputs, imag_outputs = conv(real, imag)
+            loss = tf.reduce_sum(real_outputs * real_outputs) + tf.reduce_sum(real_outputs * imag_outputs)
+        gradients.append(tape.gradient(loss, [real, imag] + conv.trainable_weights))
+
+    for four_gradient, three_gradient in zip(*gradients):
+        np.testing.assert_allclose(three_gradient, four_gradient, rtol = 1e-3, atol = 1e-3)
+
+
+def test_gauss_grouped_dilated_conv2d ():
+
+    real = tf.random.normal([2, 16, 16, 8])
+    imag = tf.random.normal([2, 16, 16, 8])
+    four_conv  = complex_Conv2D(filters = 8, strides = (1, 1), groups = 4, dilation_rate = (2, 2), bias_initializer = 'glorot_uniform')
+    three_conv = complex_Conv2D(filters = 8, strides = (1, 1), groups = 4, dilation_rate = (2, 2), gauss = True)
+    shared_weights(three_conv, four_conv, real, imag)
+
+    for four_outputs, three_outputs in zip(four_conv(real, imag), three_conv(real, imag)):
+        np.testing.assert_allclose(three_outputs, four_outputs, atol = 1e-4)
+
+
+def test_gauss_complex64_inputs ():
+
+    real = tf.random.normal([2, 16, 16, 3])
+    imag = tf.random.normal([2, 16, 16, 3])
+    four_conv  = complex_Conv2D(filters = 8, bias_initializer = 'glorot_uniform')
+    three_conv = complex_Conv2D(filters = 8, gauss = True)
+    shared_weights(three_conv, four_conv, real, imag)
+
+    outputs = three_conv(tf.complex(real, imag))
+    assert outputs.dtype == tf.complex64
+    np.testing.assert_allclose(outputs, tf.complex(*four_conv(real, imag)), atol = 1e-4)
+
+
+@pytest.mark.parametrize("layer", [complex_Conv3D, complex_Conv3DTranspose])
+@pytest.mark.parametrize("mode", [dict(fused = True), dict(fused = False, gauss = True)])
+def test_conv3d_modes_match_four_convolutions (layer, mode):
+
+    real = tf.random.normal([2, 6, 9, 9, 3])
+    imag = tf.random.normal([2, 6, 9, 9, 3])
+    four_conv = layer(filters = 4, bias_initializer = 'glorot_uniform', fused = False)
+    fast_conv = layer(filters = 4, **mode)
+    shared_weights(fast_conv, four_conv, real, imag)
+
+    for four_outputs, fast_outputs in zip(four_conv(real, imag), fast_conv(real, imag)):
+        np.testing.assert_allclose(fast_outputs, four_outputs, atol = 1e-4)
+
+
+@pytest.mark.parametrize("layer", [complex_Conv3D, complex_Conv3DTranspose])
+def test_conv3d_fused_and_gauss_are_exclusive (layer):
+
+    with pytest.raises(ValueError):
+        layer(filters = 4, gauss = True)
+
+
+@pytest.mark.parametrize("layer, shape", [(lambda **mode: complex_DepthwiseConv2D(kernel_size = (3, 3), depth_multiplier = 2, bias_initializer = 'glorot_uniform', **mode), [2, 16, 16, 8]),
+                                          (lambda **mode: complex_DepthwiseConv2D(kernel_size = (3, 3), strides = (2, 2), padding = "valid", **mode), [2, 17, 17, 4]),
+                                          (lambda **mode: complex_DepthwiseConv1D(kernel_size = 5, depth_multiplier = 2, bias_initializer = 'glorot_uniform', **mode), [2, 64, 8]),
+                                          (lambda **mode: complex_DepthwiseConv1D(kernel_size = 3, dilation_rate = 2, **mode), [2, 64, 8]),
+                                          (lambda **mode: complex_SeparableConv2D(filters = 6, depth_multiplier = 2, bias_initializer = 'glorot_uniform', **mode), [2, 16, 16, 4]),
+                                          (lambda **mode: complex_SeparableConv1D(filters = 6, kernel_size = 3, **mode), [2, 32, 4])])
+def test_fused_depthwise_matches_four_convolutions (layer, shape):
+
+    'the block kernel depthwise convolution (and the fused pointwise Dense) against four depthwise convolutions, outputs and gradients'
+    real = tf.random.normal(shape)
+    imag = tf.random.normal(shape)
+    four_conv  = layer(fused = False)
+    fused_conv = layer()
+    shared_weights(fused_conv, four_conv, real, imag)
+
+    gradients = []
+    for conv in [four_conv, fused_conv]:
+        with tf.GradientTape() as tape:
+            tape.watch([real, imag])
+            outputs = conv(real, imag)
+            loss = tf.reduce_sum(outputs[0] * tf.sin(outputs[0])) + tf.reduce_sum(outputs[1] * tf.cos(outputs[1]))
+        gradients.append((outputs, tape.gradient(loss, [real, imag] + conv.trainable_weights)))
+
+    (four_outputs, four_gradients), (fused_outputs, fused_gradients) = gradients
+    for expected, fused in zip(list(four_outputs) + four_gradients, list(fused_outputs) + fused_gradients):
+        np.testing.assert_allclose(fused, expected, atol = 1e-4)
+
+
+@pytest.mark.parametrize("shape", [[1, 64], [8, 64], [3, 5, 64]])
+def test_fused_dense_matches_four_matmuls (shape):
+
+    real = tf.random.normal(shape)
+    imag = tf.random.normal(shape)
+    four_dense  = complex_Dense(units = 32, bias_initializer = 'glorot_uniform')
+    fused_dense = complex_Dense(units = 32, fused = True)
+    shared_weights(fused_dense, four_dense, real, imag)
+
+    gradients = []
+    for dense in [four_dense, fused_dense]:
+        with tf.GradientTape() as tape:
+            tape.watch([real, imag])
+            real_outputs, imag_outputs = dense(real, imag)
+            loss = tf.reduce_sum(real_outputs * real_outputs) + tf.reduce_sum(real_outputs * imag_outputs)
+        gradients.append([real_outputs, imag_outputs] + tape.gradient(loss, [real, imag] + dense.trainable_weights))
+
+    for four_outputs, fused_outputs in zip(*gradients):
+        assert fused_outputs.shape == four_outputs.shape
+        np.testing.assert_allclose(fused_outputs, four_outputs, rtol = 1e-4, atol = 1e-4)
+
+
+def test_fused_dense_rejects_activation ():
+
+    with pytest.raises(ValueError):
+        complex_Dense(units = 4, fused = True, activation = 'relu')
+
+
+@pytest.mark.parametrize("layer, shape", [(lambda: complex_Conv2DTranspose(filters = 4, gauss = True, name = "transpose"), [2, 8, 8, 3]),
+                                          (lambda: complex_Conv3DTranspose(filters = 4, fused = False, gauss = True, name = "transpose"), [2, 4, 6, 6, 3]),
+                                          (lambda: complex_Conv1DTranspose(filters = 4, kernel_size = 3, strides = 2, name = "transpose"), [2, 16, 3]),
+                                          (lambda: complex_DepthwiseConv2D(kernel_size = (5, 5), depth_multiplier = 2, name = "depthwise"), [2, 8, 8, 3]),
+                                          (lambda: complex_DepthwiseConv1D(kernel_size = 3, strides = 2, fused = False, name = "depthwise"), [2, 16, 3]),
+                                          (lambda: complex_SeparableConv2D(filters = 4, dilation_rate = (2, 2), name = "separable"), [2, 8, 8, 3]),
+                                          (lambda: complex_SeparableConv1D(filters = 4, kernel_size = 3, name = "separable"), [2, 16, 3]),
+                                          (lambda: complex_MaxPool2D(pool_size = (3, 3), strides = (2, 2), name = "pool"), [2, 8, 8, 3]),
+                                          (lambda: complex_MaxPool1D(pool_size = (3,), strides = (2,), padding = "valid", name = "pool"), [2, 16, 3]),
+                                          (lambda: complex_AvgPool2D(padding = "valid", name = "pool"), [2, 8, 8, 3]),
+                                          (lambda: complex_AvgPool1D(pool_size = 3, name = "pool"), [2, 16, 3]),
+                                          (lambda: complex_GlobalMaxPool2D(keepdims = True, name = "pool"), [2, 8, 8, 3]),
+                                          (lambda: complex_GlobalAvgPool1D(keepdims = True, name = "pool"), [2, 16, 3])])
+def test_config_round_trip (layer, shape):
+
+    real = tf.random.normal(shape)
+    imag = tf.random.normal(shape)
+    layer = layer()
+    clone = type(layer).from_config(layer.get_config())
+    assert clone.get_config() == layer.get_config()
+
+    shared_weights(clone, layer, real, imag)
+    for outputs, clone_outputs in zip(layer(real, imag), clone(real, imag)):
+        np.testing.assert_array_equal(clone_outputs, outputs)
+
+
+def reference_magnitude_max_pool (real, imag, pool_size, strides):
+
+    'numpy, "valid" windows on [batch, width, channels], the entry of largest |z| of every window'
+    z = real.numpy() + 1j * imag.numpy()
+    windows = np.stack([z[:, begin:begin + pool_size] for begin in range(0, z.shape[1] - pool_size + 1, strides)], axis = 1)
+    argmax  = np.argmax(np.abs(windows), axis = 2)[:, :, np.newaxis]
+    return np.take_along_axis(windows, argmax, axis = 2)[:, :, 0]
+
+
+@pytest.mark.parametrize("pool_size, strides", [(3, 2), ((2,), (2,)), (4, 1)])
+def test_max_pooling_selects_largest_magnitude (pool_size, strides):
+
+    'the entry of largest |z| is selected with its real and imag, not the largest real and the largest imag'
+    real = tf.random.normal([2, 32, 5])
+    imag = tf.random.normal([2, 32, 5])
+    real_outputs, imag_outputs = complex_MaxPool1D(pool_size = pool_size, strides = strides, padding = "valid")(real, imag)
+
+    expected = reference_magnitude_max_pool(real, imag, normalize_tuple(pool_size, 1)[0], normalize_tuple(strides, 1)[0])
+    np.testing.assert_array_equal(real_outputs, expected.real)
+    np.testing.assert_array_equal(imag_outputs, expected.imag)
+    assert np.any(real_outputs != tf.nn.max_pool1d(real, pool_size, strides, "VALID"))
+
+    outputs = complex_MaxPool1D(pool_size = pool_size, strides = strides, padding = "valid")(tf.complex(real, imag))
+    np.testing.assert_array_equal(outputs, expected)
+
+
+def test_max_pooling_2d_selects_largest_magnitude ():
+
+    real = tf.random.normal([2, 16, 16, 8])
+    imag = tf.random.normal([2, 16, 16, 8])
+    real_outputs, imag_outputs = complex_MaxPool2D(pool_size = (3, 3), strides = (2, 2))(real, imag)
+    np.testing.assert_allclose(real_outputs ** 2 + imag_outputs ** 2, tf.nn.max_pool2d(real ** 2 + imag ** 2, 3, 2, "SAME"), rtol = 1e-6)
+
+    'every output is an input entry of its channel'
+    inputs = set(zip(real.numpy()[..., 0].ravel(), imag.numpy()[..., 0].ravel()))
+    assert set(zip(real_outputs.numpy()[..., 0].ravel(), imag_outputs.numpy()[..., 0].ravel())) <= inputs
+
+    for keepdims, shape in [(False, [2, 8]), (True, [2, 1, 1, 8])]:
+        real_outputs, imag_outputs = complex_GlobalMaxPool2D(keepdims = keepdims)(real, imag)
+        assert real_outputs.shape == shape
+        expected = reference_magnitude_max_pool(tf.reshape(real, [2, -1, 8]), tf.reshape(imag, [2, -1, 8]), 256, 256)
+        np.testing.assert_array_equal(tf.reshape(real_outputs, [2, 8]), expected.real[:, 0])
+        np.testing.assert_array_equal(tf.reshape(imag_outputs, [2, 8]), expected.imag[:, 0])
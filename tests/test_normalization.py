@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.normalization import *
+
+
+def offset_inputs (mean, std, shape = [64, 8, 8, 4]):
+
+    'complex inputs with a large mean and a small, correlated covariance'
+    real = mean + std * tf.random.normal(shape, seed = 0)
+    imag = -mean + 0.5 * (real - mean) + std * tf.random.normal(shape, seed = 1)
+    return real, imag
+
+
+@pytest.mark.parametrize("mean", [30.0, 3000.0])
+def test_moments_are_centred (mean):
+
+    real, imag = offset_inputs(mean, 0.05)
+    mu_real, mu_imag, Vrr, Vii, Vri = complex_moments(real, imag, [0, 1, 2])
+
+    real, imag = np.asarray(real, np.float64), np.asarray(imag, np.float64)
+    centred_real = real - real.mean(axis = (0, 1, 2))
+    centred_imag = imag - imag.mean(axis = (0, 1, 2))
+    np.testing.assert_allclose(mu_real, real.mean(axis = (0, 1, 2)), rtol = 1e-5)
+    np.testing.assert_allclose(Vrr, np.mean(centred_real ** 2, axis = (0, 1, 2)), rtol = 1e-2)
+    np.testing.assert_allclose(Vii, np.mean(centred_imag ** 2, axis = (0, 1, 2)), rtol = 1e-2)
+    np.testing.assert_allclose(Vri, np.mean(centred_real * centred_imag, axis = (0, 1, 2)), rtol = 1e-2)
+    assert np.all(Vrr * Vii - Vri ** 2 > 0)
+
+
+def test_moments_keepdims_and_gradients ():
+
+    real, imag = offset_inputs(3.0, 1.0, [4, 6, 5])
+    keep   = complex_moments(real, imag, [0, 1], keepdims = True)
+    reduce = complex_moments(real, imag, [0, 1])
+    for kept, reduced in zip(keep, reduce):
+        assert kept.shape == (1, 1, 5) and reduced.shape == (5,)
+        np.testing.assert_allclose(kept[0, 0], reduced)
+
+    'the stop_gradient mean of the second pass must not change the gradients of the variance'
+    with tf.GradientTape(persistent = True) as tape:
+        tape.watch([real, imag])
+        _, _, Vrr, Vii, Vri = complex_moments(real, imag, [0, 1])
+        loss = tf.reduce_sum(Vrr + 2 * Vii + 3 * Vri)
+        mu_real = tf.reduce_mean(real, axis = [0, 1])
+        mu_imag = tf.reduce_mean(imag, axis = [0, 1])
+        reference = tf.reduce_sum(tf.reduce_mean(tf.square(real - mu_real) + 2 * tf.square(imag - mu_imag) + 3 * (real - mu_real) * (imag - mu_imag), axis = [0, 1]))
+    for gradient, reference_gradient in zip(tape.gradient(loss, [real, imag]), tape.gradient(reference, [real, imag])):
+        np.testing.assert_allclose(gradient, reference_gradient, atol = 1e-5)
+
+
+@pytest.mark.parametrize("layer", [lambda real, imag: complex_FusedBatchNorm()(real, imag, training = True),
+                                   lambda real, imag: complex_GroupNorm(groups = 2)(real, imag),
+                                   lambda real, imag: complex_LayerNorm()(real, imag),
+                                   lambda real, imag: complex_InstanceNorm()(real, imag)])
+def test_normalization_with_large_mean (layer):
+
+    real, imag = offset_inputs(3000.0, 0.05)
+    real_outputs, imag_outputs = layer(real, imag)
+
+    assert np.all(np.isfinite(real_outputs)) and np.all(np.isfinite(imag_outputs))
+    'whitened outputs, unit variance per part'
+    assert np.allclose(np.var(real_outputs), 0.5, atol = 0.1)
+    assert np.allclose(np.var(imag_outputs), 0.5, atol = 0.1)
+
+
+def test_batchnorm_with_large_mean ():
+
+    real, imag = offset_inputs(3000.0, 0.05)
+    outputs = complex_BatchNorm2D()(tf.concat([real, imag], axis = -1), training = True)
+    assert np.all(np.isfinite(outputs))
+    assert np.allclose(np.var(outputs), 0.5, atol = 0.1)
+
+
+@pytest.fixture(scope = "module")
+def strategy ():
+
+    'one strategy for the module, the collective instance keys of two MirroredStrategy in one process collide'
+    return tf.distribute.MirroredStrategy(['/cpu:0', '/cpu:1'])
+
+
+@pytest.mark.parametrize("mean, atol", [(1.0, 1e-3), (3000.0, 5e-2)])
+def test_sync_batchnorm_matches_global_batch (strategy, mean, atol):
+
+    'at mean 3000 the float32 inputs are only resolved to 2.4e-4, 5e-3 of the 0.05 std, the replica sums round differently'
+    real, imag = offset_inputs(mean, 0.05, [8, 8, 8, 4])
+    global_bn = complex_FusedBatchNorm()
+    global_real, global_imag = global_bn(real, imag, training = True)
+
+    with strategy.scope():
+        sync_bn = complex_SyncBatchNorm()
+        sync_bn.build(real.shape)
+    dataset = strategy.experimental_distribute_dataset(tf.data.Dataset.from_tensor_slices((real, imag)).batch(8))
+    sync_real, sync_imag = strategy.run(tf.function(lambda real, imag: sync_bn(real, imag, training = True)), args = next(iter(dataset)))
+
+    assert len(strategy.experimental_local_results(sync_real)) == 2
+    np.testing.assert_allclose(tf.concat(strategy.experimental_local_results(sync_real), axis = 0), global_real, atol = atol)
+    np.testing.assert_allclose(tf.concat(strategy.experimental_local_results(sync_imag), axis = 0), global_imag, atol = atol)
+    for name in ["moving_mean", "moving_Vrr", "moving_Vii", "moving_Vri"]:
+        np.testing.assert_allclose(getattr(sync_bn, name), getattr(global_bn, name), rtol = 1e-3, atol = 1e-5)
+
+
+@pytest.mark.parametrize("options", [dict(), dict(scale = False), dict(center = False), dict(axis = 1)])
+@pytest.mark.parametrize("training", [True, False])
+def test_complex64_batchnorm_matches_pairs (options, training):
+
+    'the complex64 input is normalized natively by a z + b conj(z) + shift'
+    real, imag = offset_inputs(3.0, 1.0, [8, 5, 6, 4])
+    layer = complex_FusedBatchNorm(gamma_off_initializer = 'random_normal', beta_initializer = 'random_normal', **options)
+    real_outputs, imag_outputs = layer(real, imag, training = training)
+
+    outputs = layer(tf.complex(real, imag), training = training)
+    assert outputs.dtype == tf.complex64
+    np.testing.assert_allclose(outputs, tf.complex(real_outputs, imag_outputs), atol = 1e-5)
+
+
+def traced_ops (layer, inputs, training):
+
+    'op types of the graph of layer(*inputs, training = training)'
+    function = tf.function(lambda *inputs: layer(*inputs, training = training))
+    return [op.type for op in function.get_concrete_function(*inputs).graph.get_operations()]
+
+
+@pytest.mark.parametrize("layer, inputs", [(complex_FusedBatchNorm, lambda real, imag: (real, imag)),
+                                           (complex_FusedBatchNorm, lambda real, imag: (tf.complex(real, imag),)),
+                                           (complex_BatchNorm2D, lambda real, imag: (tf.concat([real, imag], axis = -1),))])
+def test_batchnorm_traces_one_branch (layer, inputs):
+
+    real, imag = offset_inputs(3.0, 1.0, [4, 5, 6, 3])
+    layer, inputs = layer(), inputs(real, imag)
+    layer(*inputs)
+
+    'training : batch statistics and the moving average updates, one whitening, no cond'
+    ops = traced_ops(layer, inputs, True)
+    assert ops.count("Mean") > 0 and ops.count("AssignSubVariableOp") == 4
+    assert ops.count("Sqrt") == 2 and "If" not in ops and "StatelessIf" not in ops
+
+    'inference : no batch mean or covariance, no update, one whitening of the moving statistics'
+    ops = traced_ops(layer, inputs, False)
+    assert "Mean" not in ops and "AssignSubVariableOp" not in ops
+    assert ops.count("Sqrt") == 2 and "If" not in ops and "StatelessIf" not in ops
+
+    'a symbolic training runs one of the branches through one cond'
+    function = tf.function(lambda training, *inputs: layer(*inputs, training = training))
+    ops = [op.type for op in function.get_concrete_function(tf.constant(True), *inputs).graph.get_operations()]
+    assert ops.count("If") + ops.count("StatelessIf") == 1
+
+
+def test_sync_batchnorm_runs_one_collective (strategy, monkeypatch):
+
+    'one all_gather of the local count, means and centred second moments, no all_reduce'
+    collectives = []
+    for name in ["all_gather", "all_reduce"]:
+        collective = getattr(tf.distribute.ReplicaContext, name)
+        monkeypatch.setattr(tf.distribute.ReplicaContext, name, lambda self, *args, name = name, collective = collective, **kwargs: collectives.append(name) or collective(self, *args, **kwargs))
+
+    real, imag = offset_inputs(1.0, 1.0, [8, 4, 4, 3])
+    with strategy.scope():
+        sync_bn = complex_SyncBatchNorm()
+        sync_bn.build(real.shape)
+    dataset = strategy.experimental_distribute_dataset(tf.data.Dataset.from_tensor_slices((real, imag)).batch(8))
+    strategy.run(tf.function(lambda real, imag: sync_bn(real, imag, training = True)), args = next(iter(dataset)))
+
+    assert collectives == ["all_gather"] * strategy.num_replicas_in_sync
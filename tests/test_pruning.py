@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.networks import *
+from complex_layers.pruning import *
+from complex_layers.quantization import *
+
+
+CUSTOM_OBJECTS = {"complex_Dense" : complex_Dense, "complex_Conv1D" : complex_Conv1D, "complex_Conv2D" : complex_Conv2D, "complex_Conv3D" : complex_Conv3D}
+
+
+def pruned_model ():
+
+    'Conv2D with 3 of 8 filters pruned, Dense with 80 % of its complex weights pruned'
+    real_inputs = tf.keras.Input(shape = (8, 8, 3))
+    imag_inputs = tf.keras.Input(shape = (8, 8, 3))
+    real, imag = complex_Conv2D(filters = 8, strides = (1, 1), bias_initializer = 'glorot_uniform')(real_inputs, imag_inputs)
+    real, imag = complex_Dense(units = 16, bias_initializer = 'glorot_uniform')(real, imag)
+    model = tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+
+    prune_layer(model.layers[2], 3 / 8, structured = True)
+    prune_layer(model.layers[3], 0.8)
+    return model
+
+
+def test_pruning_zeroes_complex_weights ():
+
+    layer = complex_Conv1D(filters = 8, kernel_size = 3)
+    layer(tf.random.normal([2, 16, 4]), tf.random.normal([2, 16, 4]))
+    prune_layer(layer, 0.5)
+
+    real_kernel, imag_kernel = complex_kernels(layer)
+    np.testing.assert_array_equal(real_kernel.numpy() == 0, imag_kernel.numpy() == 0)
+    assert kernel_sparsity(layer) == pytest.approx(0.5, abs = 0.01)
+
+
+def test_sparsified_model_saves_and_reloads (tmp_path):
+
+    model  = pruned_model()
+    inputs = [tf.random.normal([2, 8, 8, 3]), tf.random.normal([2, 8, 8, 3])]
+    pruned_outputs = model(inputs)
+
+    sparse_model = sparsify_for_inference(model, sparse_threshold = 0.5)
+    conv, dense  = sparse_model.layers[2], sparse_model.layers[3]
+    assert conv.inference["kept_filters"] == 5 and conv.inference["sparse_entries"] is None
+    assert dense.inference["sparse_entries"] == int(np.sum(dense.sparse_values.numpy() != 0))
+    assert all(layer.inference is None for layer in model.layers[2:])
+
+    outputs = sparse_model(inputs)
+    for pruned, sparse in zip(pruned_outputs, outputs):
+        np.testing.assert_allclose(sparse, pruned, atol = 1e-4)
+
+    'the sparse shape and the dropped filters follow from the config'
+    sparse_model.save(str(tmp_path / "sparse.keras"))
+    reloaded = tf.keras.models.load_model(str(tmp_path / "sparse.keras"), custom_objects = CUSTOM_OBJECTS)
+    for sparse, reloaded_outputs in zip(outputs, reloaded(inputs)):
+        np.testing.assert_array_equal(reloaded_outputs, sparse)
+
+    clone = tf.keras.Model.from_config(sparse_model.get_config(), custom_objects = CUSTOM_OBJECTS)
+    clone.set_weights(sparse_model.get_weights())
+    for sparse, clone_outputs in zip(outputs, clone(inputs)):
+        np.testing.assert_array_equal(clone_outputs, sparse)
+
+
+def test_quantize_keeps_dropped_filters ():
+
+    model  = pruned_model()
+    inputs = [tf.random.normal([2, 8, 8, 3]), tf.random.normal([2, 8, 8, 3])]
+    sparse_model = sparsify_for_inference(model, sparse_threshold = 0.5)
+
+    'the dropped filters of the convolution stay dropped, the sparse Dense is not quantized'
+    quantized = quantize_model(sparse_model)
+    conv, dense = quantized.layers[2], quantized.layers[3]
+    assert conv.inference["quantized"] and conv.inference["kept_filters"] == 5 and conv.complex_kernel.shape[-1] == 10
+    assert dense is sparse_model.layers[3]
+    for pruned, quantized_outputs in zip(model(inputs), quantized(inputs)):
+        np.testing.assert_allclose(quantized_outputs, pruned, atol = 0.05 * np.max(np.abs(pruned)))
+
+    with pytest.raises(ValueError):
+        quantize_layer(dense)
+
+    'sparsify after quantize keeps the int8 kernel dense'
+    quantized_dense = sparsify_layer(quantize_layer(model.layers[3]))
+    assert quantized_dense.inference["quantized"] and quantized_dense.inference["sparse_entries"] is None
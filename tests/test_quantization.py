@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.networks import *
+from complex_layers.normalization import *
+from complex_layers.folding import *
+from complex_layers.quantization import *
+from complex_layers.pruning import *
+
+
+CUSTOM_OBJECTS = {"complex_Dense" : complex_Dense, "complex_Conv1D" : complex_Conv1D, "complex_Conv2D" : complex_Conv2D, "complex_Conv3D" : complex_Conv3D}
+
+
+def quantized_model ():
+
+    real_inputs = tf.keras.Input(shape = (8, 8, 3))
+    imag_inputs = tf.keras.Input(shape = (8, 8, 3))
+    real, imag = complex_Conv2D(filters = 4, strides = (1, 1), bias_initializer = 'glorot_uniform')(real_inputs, imag_inputs)
+    real, imag = complex_Conv1D(filters = 4, kernel_size = 3, padding = "causal")(tf.reshape(real, [-1, 64, 4]), tf.reshape(imag, [-1, 64, 4]))
+    real, imag = complex_Dense(units = 5, fused = True)(tf.reshape(real, [-1, 256]), tf.reshape(imag, [-1, 256]))
+    return tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+
+
+@pytest.mark.parametrize("layer, shape", [(lambda: complex_Dense(units = 64, bias_initializer = 'glorot_uniform'), [1, 256]),
+                                          (lambda: complex_Dense(units = 8), [3, 16, 4]),
+                                          (lambda: complex_Conv1D(filters = 5, kernel_size = 3, padding = "causal", dilation_rate = 2), [3, 16, 4]),
+                                          (lambda: complex_Conv2D(filters = 5, strides = (2, 1)), [3, 9, 9, 4]),
+                                          (lambda: complex_Conv3D(filters = 5), [3, 5, 6, 6, 4])])
+def test_quantized_layer_runs_dequantized_kernel (layer, shape):
+
+    layer  = layer()
+    inputs = [tf.random.normal(shape), tf.random.normal(shape)]
+    outputs = layer(*inputs)
+
+    quantized = quantize_layer(layer)
+    assert quantized.inference == {"folded" : False, "quantized" : True, "quantized_inputs" : False, "kept_filters" : None, "sparse_entries" : None}
+    assert [weight.dtype for weight in quantized.weights] == [tf.int8, tf.float32, tf.float32]
+
+    'the dequantized kernel is within half a step of the float kernel'
+    kernel, bias = layer.block_weights()
+    quantized_kernel, quantized_bias = quantized.block_weights()
+    scale = tf.tile(quantized.kernel_scale, [2])
+    assert np.all(np.abs(quantized_kernel - kernel) <= scale / 2 + 1e-7)
+    np.testing.assert_array_equal(quantized_bias, bias)
+
+    'the stacked [xr ; xi] GEMM (few rows) and the block convolution both run the dequantized kernel'
+    reference = tf.split(quantized.convolution(tf.concat(inputs, axis = -1), quantized_kernel) + quantized_bias, 2, axis = -1)
+    for reference_outputs, quantized_outputs, float_outputs in zip(reference, quantized(*inputs), outputs):
+        np.testing.assert_allclose(quantized_outputs, reference_outputs, atol = 1e-5)
+        assert np.sqrt(np.mean((quantized_outputs - float_outputs) ** 2)) < 0.02 * np.sqrt(np.mean(float_outputs ** 2))
+
+
+def test_quantized_model_saves_and_reloads (tmp_path):
+
+    model  = quantized_model()
+    inputs = [tf.random.normal([2, 8, 8, 3]), tf.random.normal([2, 8, 8, 3])]
+    float_outputs = model(inputs)
+
+    quantized = quantize_model(model)
+    outputs   = quantized(inputs)
+    rows = accuracy_report(quantized, [inputs], [[np.asarray(output) for output in float_outputs]], print_fn = None)
+    assert all(row["snr_db"] > 30 for row in rows)
+
+    'int8 kernels only, the float model is not changed'
+    assert weight_bytes(quantized) < 0.3 * weight_bytes(model)
+    assert not [weight for weight in quantized.weights if weight.dtype == tf.float32 and weight.shape.rank > 1]
+    assert all(layer.inference is None for layer in model.layers if isinstance(layer, QUANTIZABLE_LAYERS))
+
+    quantized.save(str(tmp_path / "quantized.keras"))
+    reloaded = tf.keras.models.load_model(str(tmp_path / "quantized.keras"), custom_objects = CUSTOM_OBJECTS)
+    assert [weight.dtype for weight in reloaded.weights] == [weight.dtype for weight in quantized.weights]
+    for quantized_outputs, reloaded_outputs in zip(outputs, reloaded(inputs)):
+        np.testing.assert_array_equal(reloaded_outputs, quantized_outputs)
+
+
+def test_quantize_folded_model ():
+
+    real_inputs = tf.keras.Input(shape = (8, 8, 2))
+    imag_inputs = tf.keras.Input(shape = (8, 8, 2))
+    real, imag = complex_Conv2D(filters = 4, strides = (1, 1))(real_inputs, imag_inputs)
+    real, imag = complex_FusedBatchNorm(momentum = 1.0)(real, imag)
+    model = tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+    inputs = [tf.random.normal([2, 8, 8, 2]), tf.random.normal([2, 8, 8, 2])]
+
+    frozen    = freeze_for_inference(model)
+    quantized = quantize_model(frozen)
+    layer = quantized.layers[2]
+    assert layer.inference == {"folded" : True, "quantized" : True, "quantized_inputs" : False, "kept_filters" : None, "sparse_entries" : None} and layer.block_kernel.dtype == tf.int8
+    for frozen_outputs, quantized_outputs in zip(frozen(inputs), quantized(inputs)):
+        np.testing.assert_allclose(quantized_outputs, frozen_outputs, atol = 0.05)
+
+    with pytest.raises(ValueError):
+        quantize_layer(layer)
+
+
+@pytest.mark.parametrize("layer, shape", [(lambda: complex_Dense(units = 64, bias_initializer = 'glorot_uniform'), [1, 256]),
+                                          (lambda: complex_Dense(units = 8), [3, 16, 4]),
+                                          (lambda: complex_Conv1D(filters = 5, kernel_size = 3, padding = "causal", strides = 2), [3, 16, 4]),
+                                          (lambda: complex_Conv2D(filters = 5, strides = (2, 2)), [3, 9, 9, 4]),
+                                          (lambda: complex_Conv2D(filters = 5, strides = (1, 1), padding = "valid"), [3, 9, 9, 4])])
+def test_quantized_inputs_run_int8_products (layer, shape):
+
+    'the int32 accumulation is the exact product of the int8 inputs and kernel, rescaled once'
+    layer  = layer()
+    inputs = [tf.random.normal(shape), tf.random.normal(shape)]
+    outputs = layer(*inputs)
+
+    input_scale = float(tf.reduce_max(tf.abs(tf.stack(inputs)))) / INT8_MAX
+    quantized   = quantize_layer(layer, input_scale = input_scale)
+    assert quantized.inference["quantized_inputs"] and quantized.input_scale.numpy() == np.float32(input_scale)
+
+    'float64 convolution of the int8 values, exact for these sizes'
+    stacked   = tf.cast(quantize_int8(tf.concat(inputs, axis = 0), quantized.input_scale), tf.float64)
+    products  = quantized.convolution(stacked, tf.cast(quantized.complex_kernel, tf.float64))
+    products  = products * tf.cast(quantized.input_scale * tf.tile(quantized.kernel_scale, [2]), tf.float64)
+    (real_real, real_imag), (imag_real, imag_imag) = [tf.split(part, 2, axis = -1) for part in tf.split(products, 2, axis = 0)]
+    reference = tf.split(tf.concat([real_real - imag_imag, real_imag + imag_real], axis = -1) + tf.cast(quantized.block_bias, tf.float64), 2, axis = -1)
+
+    for reference_outputs, quantized_outputs, float_outputs in zip(reference, quantized(*inputs), outputs):
+        np.testing.assert_allclose(quantized_outputs, reference_outputs, rtol = 1e-5, atol = 1e-5)
+        assert np.sqrt(np.mean((quantized_outputs - float_outputs) ** 2)) < 0.05 * np.sqrt(np.mean(float_outputs ** 2))
+
+
+def test_quantize_model_calibrates_input_scales (tmp_path):
+
+    'the evaluated inputs are in the calibrated range, inputs beyond it are clipped'
+    model   = quantized_model()
+    dataset = [[tf.random.normal([2, 8, 8, 3]), 2 * tf.random.normal([2, 8, 8, 3])] for _ in range(3)]
+    inputs  = dataset[-1]
+
+    quantized = quantize_model(model, representative_dataset = lambda: iter(dataset))
+    layers = [layer for layer in quantized.layers if isinstance(layer, QUANTIZABLE_LAYERS)]
+    assert all(layer.inference["quantized"] and layer.inference["quantized_inputs"] for layer in layers)
+
+    'the first layer sees the model inputs, the largest |xr|, |xi| of the dataset is the int8 maximum'
+    np.testing.assert_allclose(layers[0].input_scale, np.max([np.max(np.abs(element)) for element in dataset]) / INT8_MAX, rtol = 1e-6)
+    rows = accuracy_report(quantized, [inputs], model_outputs(model, [inputs]), print_fn = None)
+    assert all(row["snr_db"] > 25 for row in rows)
+
+    quantized.save(str(tmp_path / "quantized.keras"))
+    reloaded = tf.keras.models.load_model(str(tmp_path / "quantized.keras"), custom_objects = CUSTOM_OBJECTS)
+    for quantized_outputs, reloaded_outputs in zip(quantized(inputs), reloaded(inputs)):
+        np.testing.assert_array_equal(reloaded_outputs, quantized_outputs)
+
+    'sparsify keeps the int8 inputs and their scale'
+    sparse = sparsify_layer(layers[2])
+    assert sparse.inference["quantized_inputs"] and sparse.input_scale.numpy() == layers[2].input_scale.numpy()
+
+
+def test_quantized_inputs_need_an_int8_kernel ():
+
+    'complex_Conv3D, dilated convolutions and unequal complex_Conv2D strides have no int8 convolution, quantize_model keeps their inputs float'
+    real_inputs = tf.keras.Input(shape = (16, 3))
+    imag_inputs = tf.keras.Input(shape = (16, 3))
+    real, imag = complex_Conv1D(filters = 4, kernel_size = 3, dilation_rate = 2)(real_inputs, imag_inputs)
+    real, imag = complex_Dense(units = 4)(real, imag)
+    model = tf.keras.Model(inputs = [real_inputs, imag_inputs], outputs = [real, imag])
+
+    quantized = quantize_model(model, representative_dataset = [[tf.random.normal([2, 16, 3]), tf.random.normal([2, 16, 3])]])
+    assert [layer.inference["quantized_inputs"] for layer in quantized.layers[2:]] == [False, True]
+
+    conv3d = complex_Conv3D(filters = 4)
+    conv3d(tf.random.normal([1, 4, 6, 6, 2]), tf.random.normal([1, 4, 6, 6, 2]))
+    with pytest.raises(ValueError):
+        quantize_layer(conv3d, input_scale = 0.1)
+
+    conv2d = complex_Conv2D(filters = 4, strides = (2, 1))
+    conv2d(tf.random.normal([1, 8, 8, 2]), tf.random.normal([1, 8, 8, 2]))
+    with pytest.raises(ValueError):
+        quantize_layer(conv2d, input_scale = 0.1)
+    with pytest.raises(ValueError):
+        complex_Dense(units = 4, inference = {"quantized_inputs" : True})
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from complex_layers.recurrent import *
+
+
+def reference (layer, real, imag):
+
+    'per time step and per gate, the four real matmuls (xr Wr - xi Wi, xr Wi + xi Wr) without block kernels'
+    units   = layer.units
+    columns = lambda weight, g : weight[..., g * units:(g + 1) * units]
+
+    def linear (g, xr, xi, real_kernel, imag_kernel):
+        return (tf.matmul(xr, columns(real_kernel, g)) - tf.matmul(xi, columns(imag_kernel, g)),
+                tf.matmul(xr, columns(imag_kernel, g)) + tf.matmul(xi, columns(real_kernel, g)))
+
+    h = [tf.zeros([real.shape[0], units]), tf.zeros([real.shape[0], units])]
+    c = [tf.zeros([real.shape[0], units]), tf.zeros([real.shape[0], units])]
+    outputs = []
+    for t in range(real.shape[1]):
+        gate   = lambda g, p : linear(g, real[:, t], imag[:, t], layer.real_kernel, layer.imag_kernel)[p] + columns([layer.real_bias, layer.imag_bias][p], g)
+        hidden = lambda g, p : linear(g, h[0], h[1], layer.real_recurrent_kernel, layer.imag_recurrent_kernel)[p]
+        if isinstance(layer, complex_LSTM):
+            c = [tf.sigmoid(gate(1, p) + hidden(1, p)) * c[p] + tf.sigmoid(gate(0, p) + hidden(0, p)) * tf.tanh(gate(2, p) + hidden(2, p)) for p in range(2)]
+            h = [tf.sigmoid(gate(3, p) + hidden(3, p)) * tf.tanh(c[p]) for p in range(2)]
+        else:
+            recurrent_bias = [layer.real_recurrent_bias, layer.imag_recurrent_bias]
+            z = [tf.sigmoid(gate(0, p) + hidden(0, p)) for p in range(2)]
+            n = [tf.tanh(gate(2, p) + tf.sigmoid(gate(1, p) + hidden(1, p)) * (hidden(2, p) + recurrent_bias[p])) for p in range(2)]
+            h = [z[p] * h[p] + (1 - z[p]) * n[p] for p in range(2)]
+        outputs.append(h)
+
+    return tf.stack([output[0] for output in outputs], 1), tf.stack([output[1] for output in outputs], 1)
+
+
+@pytest.mark.parametrize("layer", [complex_LSTM, complex_GRU])
+def test_fused_cell_matches_reference (layer):
+
+    real  = tf.random.normal([2, 12, 5])
+    imag  = tf.random.normal([2, 12, 5])
+    layer = layer(units = 8, return_sequences = True, bias_initializer = 'glorot_uniform')
+    weights = [tf.random.normal([2, 12, 8]) for _ in range(2)]
+
+    gradients = []
+    for function in [layer, lambda real, imag : reference(layer, real, imag)]:
+        with tf.GradientTape() as tape:
+            tape.watch([real, imag])
+            outputs = function(real, imag)
+            loss = tf.reduce_sum(outputs[0] * weights[0]) + tf.reduce_sum(outputs[1] * weights[1])
+        gradients.append(tape.gradient(loss, [real, imag] + layer.trainable_weights))
+        if function is layer:
+            fused_outputs = outputs
+
+    for fused, expected in zip(fused_outputs, outputs):
+        np.testing.assert_allclose(fused, expected, atol = 1e-5)
+    for fused, expected in zip(*gradients):
+        np.testing.assert_allclose(fused, expected, atol = 1e-5)
+
+
+@pytest.mark.parametrize("layer", [complex_LSTM, complex_GRU])
+def test_stateful_chunks_match_whole_sequence (layer):
+
+    real = tf.random.normal([2, 12, 5])
+    imag = tf.random.normal([2, 12, 5])
+    offline = layer(units = 8, return_sequences = True, bias_initializer = 'glorot_uniform')
+    outputs = offline(real, imag)
+
+    stream = layer(units = 8, return_sequences = True, stateful = True)
+    stream(real[:, :1], imag[:, :1])
+    for stream_weight, offline_weight in zip(stream.trainable_weights, offline.trainable_weights):
+        stream_weight.assign(offline_weight)
+    assert stream.non_trainable_weights == stream.state_variables and len(stream.state_variables) == stream.state_number
+
+    'uneven chunks through call, then frame by frame through step, after a reset'
+    for chunks in [[(0, 5), (5, 6), (6, 12)], [(t, t + 1) for t in range(12)]]:
+        stream.reset_states(batch_size = 2)
+        if len(chunks) == 3:
+            frames = [stream(real[:, begin:end], imag[:, begin:end]) for begin, end in chunks]
+        else:
+            frames = [tuple(part[:, tf.newaxis] for part in stream.step(real[:, t], imag[:, t])) for t, _ in chunks]
+        for part in range(2):
+            np.testing.assert_allclose(tf.concat([frame[part] for frame in frames], axis = 1), outputs[part], atol = 1e-5)
+
+    'a new batch size'
+    stream.reset_states(batch_size = 1)
+    np.testing.assert_allclose(stream(real[:1], imag[:1])[0], outputs[0][:1], atol = 1e-5)